@@ -6,13 +6,30 @@ import os
 # Make api/ importable
 sys.path.insert(0, os.path.dirname(__file__))
 import model_utils
+import history_store
+import guard
+import auth
+
+_guard = guard.from_env()
 
 
 class handler(BaseHTTPRequestHandler):
     def do_POST(self):
         try:
             length = int(self.headers.get("Content-Length", 0))
-            body   = self.rfile.read(length)
+        except ValueError:
+            self._respond(400, {"error": "Invalid Content-Length."})
+            return
+        client = _guard.client_key(self.client_address[0], self.headers.get("X-Forwarded-For"))
+        err = _guard.check_request(client, length)
+        if err:
+            # The body is left unread, so don't reuse the connection
+            self.close_connection = True
+            self._respond(*err)
+            return
+
+        try:
+            body   = self.rfile.read(length) if length > 0 else b""
             data   = json.loads(body) if body else {}
         except Exception:
             self._respond(400, {"error": "Invalid JSON body."})
@@ -22,12 +39,24 @@ class handler(BaseHTTPRequestHandler):
         if not prompt:
             self._respond(400, {"error": "Missing 'prompt' in request body."})
             return
+        err = _guard.check_prompt(prompt)
+        if err:
+            self._respond(*err)
+            return
 
         try:
-            result = model_utils.predict(prompt)
+            result = model_utils.predict(
+                prompt,
+                explain=bool(data.get("explain")),
+                early_exit=data.get("early_exit"),
+                early_exit_delta=data.get("early_exit_delta"),
+                session_id=data.get("session_id"),
+            )
             if "error" in result:
                 self._respond(400, result)
             else:
+                user_id = auth.user_from_header(self.headers.get("Authorization"))
+                history_store.record(prompt, result, user_id=user_id)
                 self._respond(200, result)
         except FileNotFoundError as e:
             self._respond(503, {
@@ -48,12 +77,14 @@ class handler(BaseHTTPRequestHandler):
     def _cors_headers(self):
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
-        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type, Authorization")
 
-    def _respond(self, code, data):
+    def _respond(self, code, data, headers=None):
         body = json.dumps(data).encode()
         self.send_response(code)
         self._cors_headers()
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.send_header("Content-Type", "application/json")
         self.send_header("Content-Length", str(len(body)))
         self.end_headers()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+MediTriageAI - Request Guard (Vercel version)
+Identical to backend/guard.py.
+
+Admission control for the analyze endpoints, shared by backend/app.py,
+api/index.py and api/analyze.py. It runs before the body is parsed:
+
+  1. Per-client token bucket: `rate` requests per second with bursts of up
+     to `burst`. Over the limit → 429 with a Retry-After header.
+  2. Body size: a Content-Length above `max_body_bytes` → 413; the body is
+     never read.
+  3. Prompt length: after parsing, a prompt above `max_prompt_chars` → 413,
+     before symptom extraction (whose cost grows with the prompt).
+
+Buckets live in a fixed number of shards, each an OrderedDict with its own
+lock and counters, so concurrent clients rarely contend. A bucket is a
+(tokens, stamp) tuple. Once a client has been idle long enough for its
+bucket to refill, the entry carries no information and is evicted; each
+shard is also capped at max_clients / shards entries (least recently seen
+goes first).
+
+Environment (0 disables the corresponding check):
+  MEDITRIAGE_MAX_BODY_BYTES    largest accepted request body (default 16384)
+  MEDITRIAGE_MAX_PROMPT_CHARS  longest accepted prompt (default 2000)
+  MEDITRIAGE_RATE_LIMIT        requests per second per client (default 2)
+  MEDITRIAGE_RATE_BURST        bucket size (default 10)
+  MEDITRIAGE_RATE_MAX_CLIENTS  buckets kept in memory (default 100000)
+  MEDITRIAGE_TRUST_PROXY       number of trusted proxies in front of the app (default 0)
+
+Clients are keyed by the connecting address. Behind N trusted proxies
+(MEDITRIAGE_TRUST_PROXY=N, as Werkzeug's ProxyFix x_for=N) the key is the
+N-th X-Forwarded-For entry from the right: the address the outermost trusted
+proxy saw. Entries left of it are client-supplied and never used, so a
+client cannot get a fresh bucket by rotating the header.
+"""
+
+import os
+import math
+import time
+import threading
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """Sharded per-key token buckets with idle eviction."""
+
+    def __init__(self, rate: float = 2.0, burst: float = 10.0,
+                 max_clients: int = 100_000, shards: int = 16):
+        self.rate      = rate
+        self.burst     = burst
+        self.idle_ttl  = burst / rate    # a bucket idle this long is full again
+        self.per_shard = max(1, max_clients // shards)
+        # (lock, buckets, counters); counters only change under their shard's lock
+        self._shards   = [(threading.Lock(), OrderedDict(), {"allowed": 0, "limited": 0, "evicted": 0})
+                          for _ in range(shards)]
+
+    def acquire(self, key: str) -> float:
+        """Take one token for `key`. Returns 0.0 if allowed, else seconds until one is available."""
+        now = time.monotonic()
+        lock, buckets, stats = self._shards[hash(key) % len(self._shards)]
+        with lock:
+            entry = buckets.pop(key, None)
+            if entry is None:
+                tokens = self.burst
+            else:
+                tokens = min(self.burst, entry[0] + (now - entry[1]) * self.rate)
+
+            # Re-inserted at the end, so the front of the shard is always the longest idle
+            if tokens >= 1.0:
+                buckets[key] = (tokens - 1.0, now)
+                wait = 0.0
+            else:
+                buckets[key] = (tokens, now)
+                wait = (1.0 - tokens) / self.rate
+
+            cutoff = now - self.idle_ttl
+            while buckets:
+                oldest = next(iter(buckets.values()))
+                if oldest[1] > cutoff and len(buckets) <= self.per_shard:
+                    break
+                buckets.popitem(last=False)
+                stats["evicted"] += 1
+            stats["limited" if wait else "allowed"] += 1
+        return wait
+
+    def __len__(self) -> int:
+        return sum(len(b) for _, b, _ in self._shards)
+
+    @property
+    def stats(self) -> dict:
+        totals = {"allowed": 0, "limited": 0, "evicted": 0}
+        for lock, _, stats in self._shards:
+            with lock:
+                for k, v in stats.items():
+                    totals[k] += v
+        return totals
+
+    def info(self) -> dict:
+        return {"rate": self.rate, "burst": self.burst, "clients": len(self), **self.stats}
+
+
+class RequestGuard:
+    """
+    Admission checks for one analyze request. The check_* methods return None
+    when the request may proceed, else (status, body, headers) for the caller
+    to send as-is.
+    """
+
+    def __init__(self, max_body_bytes: int = 16384, max_prompt_chars: int = 2000,
+                 limiter: TokenBucketLimiter = None, trusted_proxies: int = 0):
+        self.max_body_bytes   = max_body_bytes
+        self.max_prompt_chars = max_prompt_chars
+        self.limiter          = limiter
+        self.trusted_proxies  = trusted_proxies
+
+    def client_key(self, remote_addr: str, forwarded_for: str = None) -> str:
+        if self.trusted_proxies and forwarded_for:
+            hops = [h.strip() for h in forwarded_for.split(",")]
+            # Fewer entries than trusted proxies: the header was not set by them
+            if len(hops) >= self.trusted_proxies and hops[-self.trusted_proxies]:
+                return hops[-self.trusted_proxies]
+        return remote_addr or "unknown"
+
+    def check_request(self, client: str, content_length) -> tuple:
+        if self.limiter is not None:
+            wait = self.limiter.acquire(client)
+            if wait:
+                retry_after = max(1, math.ceil(wait))
+                return 429, {
+                    "error": "Too many requests. Please slow down.",
+                    "retry_after": retry_after,
+                }, {"Retry-After": str(retry_after)}
+        if self.max_body_bytes and content_length and content_length > self.max_body_bytes:
+            return 413, {
+                "error": "Request body too large.",
+                "max_bytes": self.max_body_bytes,
+            }, {}
+        return None
+
+    def check_prompt(self, prompt: str) -> tuple:
+        if self.max_prompt_chars and len(prompt) > self.max_prompt_chars:
+            return 413, {
+                "error": f"Prompt too long (max {self.max_prompt_chars} characters).",
+                "max_chars": self.max_prompt_chars,
+            }, {}
+        return None
+
+    def info(self) -> dict:
+        return {
+            "max_body_bytes":   self.max_body_bytes,
+            "max_prompt_chars": self.max_prompt_chars,
+            "rate_limit":       self.limiter.info() if self.limiter is not None else None,
+        }
+
+
+def _trusted_proxies(value: str) -> int:
+    value = value.strip().lower()
+    if value in ("true", "yes", "on"):
+        return 1
+    return max(0, int(value)) if value.isdigit() else 0
+
+
+def from_env() -> RequestGuard:
+    """Build the RequestGuard from MEDITRIAGE_* variables."""
+    rate    = float(os.environ.get("MEDITRIAGE_RATE_LIMIT", 2))
+    limiter = None
+    if rate > 0:
+        limiter = TokenBucketLimiter(
+            rate=rate,
+            burst=float(os.environ.get("MEDITRIAGE_RATE_BURST", 10)),
+            max_clients=int(os.environ.get("MEDITRIAGE_RATE_MAX_CLIENTS", 100_000)),
+        )
+    return RequestGuard(
+        max_body_bytes=int(os.environ.get("MEDITRIAGE_MAX_BODY_BYTES", 16384)),
+        max_prompt_chars=int(os.environ.get("MEDITRIAGE_MAX_PROMPT_CHARS", 2000)),
+        limiter=limiter,
+        trusted_proxies=_trusted_proxies(os.environ.get("MEDITRIAGE_TRUST_PROXY", "")),
+    )
@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+MediTriageAI - Server-side History Store (Vercel version)
+Identical to backend/history_store.py. On Vercel only /tmp is writable,
+so point MEDITRIAGE_HISTORY_DB there.
+
+Records every successful analysis server-side without making the caller
+wait for the write. Results are pushed onto a bounded in-process queue and
+a background writer flushes them to a pluggable store in batches.
+
+The bundled SQLiteHistoryStore (WAL mode) stands in for the Supabase
+`analyses` table. Recording is opt-in: set MEDITRIAGE_HISTORY_DB to a
+database path to enable it.
+
+The store also keeps per-user rollups (risk-level counts, disease counts,
+totals) up to date inside the same transaction as each insert, and serves
+paginated history with keyset cursors over (user_id, created_at, id).
+
+Environment:
+  MEDITRIAGE_HISTORY_DB              SQLite path (unset = disabled)
+  MEDITRIAGE_HISTORY_FLUSH_INTERVAL  seconds between flushes   (default 0.5)
+  MEDITRIAGE_HISTORY_BATCH_SIZE      max rows per insert batch (default 100)
+  MEDITRIAGE_HISTORY_QUEUE_SIZE      max pending rows          (default 10000)
+"""
+
+import os
+import json
+import base64
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import closing
+from datetime import datetime, timezone
+
+
+# ─── Stores ───────────────────────────────────────────────────────────────────
+
+class HistoryStore(ABC):
+    """
+    Base class for history backends. WriteBehindQueue calls insert_many() and,
+    once the queue has drained, close() from its writer thread.
+    """
+
+    @abstractmethod
+    def insert_many(self, records: list) -> None:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteHistoryStore(HistoryStore):
+    """
+    Local SQLite store mirroring the Supabase `analyses` table.
+    Writes go through one connection owned by the writer thread. Each read
+    opens a short-lived connection and closes it, so request threads hold
+    no file handles once they return; WAL lets those reads run alongside
+    the writer.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS analyses (
+            id            INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id       TEXT,
+            prompt        TEXT    NOT NULL,
+            disease       TEXT,
+            risk_level    TEXT,
+            confidence    REAL,
+            is_emergency  INTEGER NOT NULL DEFAULT 0,
+            full_result   TEXT,
+            created_at    TEXT    NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_analyses_user_created
+            ON analyses (user_id, created_at, id);
+
+        CREATE TABLE IF NOT EXISTS user_totals (
+            user_id       TEXT PRIMARY KEY,
+            total         INTEGER NOT NULL DEFAULT 0,
+            emergencies   INTEGER NOT NULL DEFAULT 0,
+            first_at      TEXT,
+            last_at       TEXT
+        );
+        CREATE TABLE IF NOT EXISTS user_risk_counts (
+            user_id       TEXT NOT NULL,
+            risk_level    TEXT NOT NULL,
+            count         INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, risk_level)
+        );
+        CREATE TABLE IF NOT EXISTS user_disease_counts (
+            user_id       TEXT NOT NULL,
+            disease       TEXT NOT NULL,
+            count         INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, disease)
+        );
+        CREATE INDEX IF NOT EXISTS idx_user_disease_counts_rank
+            ON user_disease_counts (user_id, count DESC);
+    """
+
+    # Rows returned by list_page(): everything except the heavy full_result
+    SUMMARY_COLUMNS = (
+        "id, user_id, substr(prompt, 1, 120) AS prompt_preview, length(prompt) AS prompt_length, "
+        "disease, risk_level, confidence, is_emergency, created_at"
+    )
+
+    def __init__(self, path: str):
+        self.path    = path
+        self._writer = None   # opened by the first insert_many(), on the writer thread
+        with closing(self._connect()) as conn:
+            self._setup(conn)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _writer_conn(self) -> sqlite3.Connection:
+        if self._writer is None:
+            self._writer = self._connect()
+            self._writer.execute("PRAGMA synchronous=NORMAL")
+        return self._writer
+
+    def _setup(self, conn: sqlite3.Connection) -> None:
+        conn.execute("PRAGMA journal_mode=WAL")   # persistent: stored in the database file
+        conn.executescript(self.SCHEMA)
+        conn.commit()
+        # Databases written before the rollup tables existed need one backfill
+        has_rows    = conn.execute("SELECT 1 FROM analyses WHERE user_id IS NOT NULL LIMIT 1").fetchone()
+        has_rollups = conn.execute("SELECT 1 FROM user_totals LIMIT 1").fetchone()
+        if has_rows and not has_rollups:
+            self.rebuild_rollups()
+
+    def rebuild_rollups(self) -> None:
+        """Recompute every rollup table from the raw analyses rows."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM user_totals")
+            conn.execute("DELETE FROM user_risk_counts")
+            conn.execute("DELETE FROM user_disease_counts")
+            conn.execute(
+                "INSERT INTO user_totals (user_id, total, emergencies, first_at, last_at) "
+                "SELECT user_id, COUNT(*), SUM(is_emergency), MIN(created_at), MAX(created_at) "
+                "FROM analyses WHERE user_id IS NOT NULL GROUP BY user_id"
+            )
+            conn.execute(
+                "INSERT INTO user_risk_counts (user_id, risk_level, count) "
+                "SELECT user_id, risk_level, COUNT(*) FROM analyses "
+                "WHERE user_id IS NOT NULL AND risk_level IS NOT NULL GROUP BY user_id, risk_level"
+            )
+            conn.execute(
+                "INSERT INTO user_disease_counts (user_id, disease, count) "
+                "SELECT user_id, disease, COUNT(*) FROM analyses "
+                "WHERE user_id IS NOT NULL AND disease IS NOT NULL GROUP BY user_id, disease"
+            )
+
+    def _update_rollups(self, conn: sqlite3.Connection, rows: list) -> None:
+        """Fold a batch into the rollup tables (called inside the insert transaction)."""
+        totals, risks, diseases = {}, {}, {}
+        for user_id, _, disease, risk, _, emergency, _, created_at in rows:
+            if user_id is None:
+                continue
+            t = totals.setdefault(user_id, [0, 0, created_at, created_at])
+            t[0] += 1
+            t[1] += emergency
+            t[2] = min(t[2], created_at)
+            t[3] = max(t[3], created_at)
+            if risk is not None:
+                risks[(user_id, risk)] = risks.get((user_id, risk), 0) + 1
+            if disease is not None:
+                diseases[(user_id, disease)] = diseases.get((user_id, disease), 0) + 1
+
+        conn.executemany(
+            "INSERT INTO user_totals (user_id, total, emergencies, first_at, last_at) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT (user_id) DO UPDATE SET "
+            "total = total + excluded.total, "
+            "emergencies = emergencies + excluded.emergencies, "
+            "first_at = min(first_at, excluded.first_at), "
+            "last_at = max(last_at, excluded.last_at)",
+            [(u, *t) for u, t in totals.items()],
+        )
+        conn.executemany(
+            "INSERT INTO user_risk_counts (user_id, risk_level, count) VALUES (?, ?, ?) "
+            "ON CONFLICT (user_id, risk_level) DO UPDATE SET count = count + excluded.count",
+            [(u, r, n) for (u, r), n in risks.items()],
+        )
+        conn.executemany(
+            "INSERT INTO user_disease_counts (user_id, disease, count) VALUES (?, ?, ?) "
+            "ON CONFLICT (user_id, disease) DO UPDATE SET count = count + excluded.count",
+            [(u, d, n) for (u, d), n in diseases.items()],
+        )
+
+    def insert_many(self, records: list) -> None:
+        rows = [
+            (
+                r.get("user_id"),
+                r["prompt"],
+                r.get("disease"),
+                r.get("risk_level"),
+                r.get("confidence"),
+                1 if r.get("is_emergency") else 0,
+                json.dumps(r.get("full_result"), default=str),
+                r["created_at"],
+            )
+            for r in records
+        ]
+        conn = self._writer_conn()
+        with conn:
+            conn.executemany(
+                "INSERT INTO analyses (user_id, prompt, disease, risk_level, confidence, "
+                "is_emergency, full_result, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._update_rollups(conn, rows)
+
+    # ── Reads ──
+
+    def list_page(self, user_id: str, limit: int = 20, cursor: str = None) -> dict:
+        """
+        Return one page of a user's history, newest first, as summary rows.
+        `cursor` is the `next_cursor` of the previous page; the query seeks
+        straight to it through the (user_id, created_at, id) index.
+        """
+        limit  = max(1, min(int(limit), 100))
+        sql    = f"SELECT {self.SUMMARY_COLUMNS} FROM analyses WHERE user_id = ?"
+        params = [user_id]
+        if cursor:
+            created_at, row_id = decode_cursor(cursor)
+            sql += " AND (created_at, id) < (?, ?)"
+            params += [created_at, row_id]
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with closing(self._connect()) as conn:
+            cur  = conn.execute(sql, params)
+            cols = [c[0] for c in cur.description]
+            rows = [dict(zip(cols, r)) for r in cur.fetchall()]
+        for r in rows:
+            r["is_emergency"] = bool(r["is_emergency"])
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+        return {"items": rows, "next_cursor": next_cursor}
+
+    def get(self, user_id: str, analysis_id: int):
+        """Return one full analysis (including full_result), or None."""
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "SELECT id, user_id, prompt, disease, risk_level, confidence, is_emergency, "
+                "full_result, created_at FROM analyses WHERE id = ? AND user_id = ?",
+                (analysis_id, user_id),
+            )
+            row = cur.fetchone()
+        if row is None:
+            return None
+        rec = dict(zip([c[0] for c in cur.description], row))
+        rec["is_emergency"] = bool(rec["is_emergency"])
+        rec["full_result"]  = json.loads(rec["full_result"]) if rec["full_result"] else None
+        return rec
+
+    def summary(self, user_id: str, top_n: int = 5) -> dict:
+        """Per-user rollups, read from the precomputed tables only."""
+        with closing(self._connect()) as conn:
+            t = conn.execute(
+                "SELECT total, emergencies, first_at, last_at FROM user_totals WHERE user_id = ?",
+                (user_id,),
+            ).fetchone()
+            risks = conn.execute(
+                "SELECT risk_level, count FROM user_risk_counts WHERE user_id = ?", (user_id,)
+            ).fetchall()
+            diseases = conn.execute(
+                "SELECT disease, count FROM user_disease_counts WHERE user_id = ? "
+                "ORDER BY count DESC, disease LIMIT ?",
+                (user_id, max(1, min(int(top_n), 50))),
+            ).fetchall()
+        total, emergencies, first_at, last_at = t if t else (0, 0, None, None)
+        return {
+            "user_id":       user_id,
+            "total":         total,
+            "emergencies":   emergencies,
+            "first_at":      first_at,
+            "last_at":       last_at,
+            "risk_counts":   {r: n for r, n in risks},
+            "top_diseases":  [{"disease": d, "count": n} for d, n in diseases],
+        }
+
+    def close(self) -> None:
+        """
+        Checkpoint the WAL into the main database and close the writer
+        connection. Call it from the writer thread: SQLite connections can
+        only be closed by the thread that opened them.
+        """
+        conn, self._writer = self._writer, None
+        if conn is None:
+            return
+        try:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            print(f"⚠️  History WAL checkpoint failed: {e}")
+        conn.close()
+
+
+def encode_cursor(created_at: str, row_id: int) -> str:
+    raw = f"{created_at}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Inverse of encode_cursor(). Raises ValueError on a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.rsplit("|", 1)
+        return created_at, int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor.")
+
+
+# ─── Write-behind queue ───────────────────────────────────────────────────────
+
+class WriteBehindQueue:
+    """
+    Bounded queue drained by a single background writer thread.
+
+    submit() never blocks: when the queue is full the record is dropped and
+    counted. The writer flushes whenever `batch_size` rows are pending or
+    `flush_interval` seconds have passed, whichever comes first. close()
+    stops accepting new rows; the writer then drains what is left and closes
+    the store on its own thread.
+    """
+
+    def __init__(self, store: HistoryStore, flush_interval: float = 0.5,
+                 batch_size: int = 100, max_size: int = 10000):
+        self.store          = store
+        self.flush_interval = flush_interval
+        self.batch_size     = max(1, batch_size)
+        self._queue         = queue.Queue(maxsize=max_size)
+        self._closed        = threading.Event()
+        self.stats          = {"submitted": 0, "written": 0, "dropped": 0, "failed": 0}
+        self._stats_lock    = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+
+    def _count(self, key: str, n: int = 1) -> None:
+        # Updated from request threads and the writer thread alike
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def submit(self, record: dict) -> bool:
+        if self._closed.is_set():
+            self._count("dropped")
+            return False
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("submitted")
+        return True
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _take_batch(self, timeout: float) -> list:
+        batch = []
+        deadline = time.monotonic() + timeout
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: list) -> None:
+        try:
+            self.store.insert_many(batch)
+            self._count("written", len(batch))
+        except Exception as e:
+            self._count("failed", len(batch))
+            print(f"⚠️  History write failed ({len(batch)} rows dropped): {e}")
+
+    def _run(self) -> None:
+        while not self._closed.is_set():
+            batch = self._take_batch(self.flush_interval)
+            if batch:
+                self._write(batch)
+        # Drain whatever was queued before close()
+        while True:
+            batch = self._take_batch(0)
+            if not batch:
+                break
+            self._write(batch)
+        self.store.close()
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Stop accepting rows and wait up to `timeout` for the drain and store close."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._thread.join(timeout)
+
+
+# ─── Module-level recorder ────────────────────────────────────────────────────
+
+_recorder      = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder():
+    """Return the process-wide WriteBehindQueue, or None if history is disabled."""
+    global _recorder
+    if _recorder is not None:
+        return _recorder
+
+    path = os.environ.get("MEDITRIAGE_HISTORY_DB")
+    if not path:
+        return None
+
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = WriteBehindQueue(
+                SQLiteHistoryStore(path),
+                flush_interval=float(os.environ.get("MEDITRIAGE_HISTORY_FLUSH_INTERVAL", 0.5)),
+                batch_size=int(os.environ.get("MEDITRIAGE_HISTORY_BATCH_SIZE", 100)),
+                max_size=int(os.environ.get("MEDITRIAGE_HISTORY_QUEUE_SIZE", 10000)),
+            )
+            atexit.register(shutdown)
+    return _recorder
+
+
+def get_store():
+    """Return the store behind the recorder (for reads), or None if disabled."""
+    recorder = get_recorder()
+    return recorder.store if recorder is not None else None
+
+
+def record(prompt: str, result: dict, user_id: str = None) -> bool:
+    """
+    Queue an analysis for writing. Returns False if disabled, dropped, or
+    there is no user_id (rows without an owner could never be read back).
+    """
+    recorder = get_recorder()
+    if recorder is None or not user_id:
+        return False
+    return recorder.submit({
+        "user_id":      user_id,
+        "prompt":       prompt,
+        "disease":      result.get("predicted_disease"),
+        "risk_level":   result.get("risk_level"),
+        "confidence":   result.get("confidence"),
+        "is_emergency": result.get("is_emergency"),
+        "full_result":  result,
+        "created_at":   datetime.now(timezone.utc).isoformat(timespec="microseconds"),
+    })
+
+
+def shutdown() -> None:
+    """Drain pending writes and close the store. Safe to call more than once."""
+    global _recorder
+    with _recorder_lock:
+        recorder, _recorder = _recorder, None
+    if recorder is not None:
+        recorder.close()
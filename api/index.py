@@ -4,19 +4,62 @@ All /api/* routes are served from this single Flask app.
 Vercel auto-discovers this file as the Flask entrypoint.
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 import os
 import sys
+import hmac
+import time
 import pickle
 
 # Make api/ importable (model_utils.py lives here)
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 import model_utils
+import history_store
+import profiler
+import shadow
+import guard
+import auth
 
 app = Flask(__name__)
 CORS(app, origins="*")
 
+# Rate limits and size caps for /api/analyze (see guard.py)
+_guard = guard.from_env()
+app.config["MAX_CONTENT_LENGTH"] = _guard.max_body_bytes or None
+
+# Both None unless enabled via MEDITRIAGE_PROFILE / MEDITRIAGE_SHADOW_MODEL_DIR;
+# a disabled profiler registers no hooks
+_profiler = profiler.from_env()
+_shadow   = shadow.from_env()
+
+if _profiler is not None:
+    @app.before_request
+    def _profile_start():
+        _profiler.start_request(method=request.method, path=request.path)
+
+    @app.after_request
+    def _profile_status(response):
+        _profiler.annotate(status=response.status_code)
+        return response
+
+    @app.teardown_request
+    def _profile_end(exc):
+        if exc is None and g.get("profile_on_close"):
+            return  # a streamed body is still being sent; see _end_profile_on_close()
+        _profiler.end_request(**({"error": repr(exc)} if exc is not None else {}))
+
+
+def _guard_response(err):
+    status, body, headers = err
+    return jsonify(body), status, headers
+
+
+@app.errorhandler(413)
+def too_large(e):
+    return _guard_response((413, {"error": "Request body too large.",
+                                  "max_bytes": _guard.max_body_bytes}, {}))
+
 
 @app.route("/api/health", methods=["GET"])
 def health():
@@ -27,16 +70,17 @@ def health():
 def analyze():
     if request.method == "OPTIONS":
         return "", 200
-    data = request.get_json(silent=True)
-    if not data or "prompt" not in data:
-        return jsonify({"error": "Missing 'prompt' in request body."}), 400
-    prompt = str(data["prompt"]).strip()
-    if not prompt:
-        return jsonify({"error": "Prompt cannot be empty."}), 400
+    data, prompt, err = _read_analyze_request()
+    if err:
+        return err
+    timings = {} if _profiler is not None else None
     try:
-        result = model_utils.predict(prompt)
+        started = time.perf_counter()
+        result = model_utils.predict(prompt, timings=timings, **_predict_options(data))
+        _annotate_profile(prompt, result, timings)
         if "error" in result:
             return jsonify(result), 400
+        _record_analysis(prompt, result, (time.perf_counter() - started) * 1000)
         return jsonify(result), 200
     except FileNotFoundError as e:
         return jsonify({"error": "Model not found.", "details": str(e)}), 503
@@ -44,6 +88,108 @@ def analyze():
         return jsonify({"error": "Internal error during analysis.", "details": str(e)}), 500
 
 
+# NDJSON: "verdict", then "predictions", then "analysis" events (see backend/app.py)
+@app.route("/api/analyze/stream", methods=["POST", "OPTIONS"])
+def analyze_stream():
+    if request.method == "OPTIONS":
+        return "", 200
+    data, prompt, err = _read_analyze_request()
+    if err:
+        return err
+    timings = {} if _profiler is not None else None
+    started = time.perf_counter()
+    parts   = model_utils.predict_stream(prompt, timings=timings, **_predict_options(data))
+    try:
+        event, first = next(parts)
+    except FileNotFoundError as e:
+        return jsonify({"error": "Model not found.", "details": str(e)}), 503
+    except Exception as e:
+        return jsonify({"error": "Internal error during analysis.", "details": str(e)}), 500
+    if event == "error":
+        _annotate_profile(prompt, first, timings)
+        return jsonify(first), 400
+    busy = time.perf_counter() - started
+
+    @stream_with_context
+    def generate():
+        nonlocal busy
+        result = dict(first)
+        yield _ndjson(event, first)
+        while True:
+            t = time.perf_counter()
+            try:
+                part = next(parts, None)
+            except Exception as e:
+                yield _ndjson("error", {"error": "Internal error during analysis.", "details": str(e)})
+                return
+            busy += time.perf_counter() - t
+            if part is None:
+                break
+            result.update(part[1])
+            yield _ndjson(*part)
+        _annotate_profile(prompt, result, timings)
+        _record_analysis(prompt, result, busy * 1000)
+
+    # Teardown runs before a streamed body is sent, so the profile ends on close
+    _annotate_profile(prompt, first, timings)
+    return _end_profile_on_close(Response(generate(), mimetype="application/x-ndjson",
+                                          headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}))
+
+
+def _read_analyze_request():
+    client = _guard.client_key(request.remote_addr, request.headers.get("X-Forwarded-For"))
+    err = _guard.check_request(client, request.content_length)
+    if err:
+        return None, None, _guard_response(err)
+    data = request.get_json(silent=True)
+    if not data or "prompt" not in data:
+        return None, None, (jsonify({"error": "Missing 'prompt' in request body."}), 400)
+    prompt = str(data["prompt"]).strip()
+    if not prompt:
+        return None, None, (jsonify({"error": "Prompt cannot be empty."}), 400)
+    err = _guard.check_prompt(prompt)
+    if err:
+        return None, None, _guard_response(err)
+    return data, prompt, None
+
+
+def _predict_options(data):
+    return {
+        "explain":          bool(data.get("explain")),
+        "early_exit":       data.get("early_exit"),
+        "early_exit_delta": data.get("early_exit_delta"),
+        "session_id":       data.get("session_id"),
+    }
+
+
+def _annotate_profile(prompt, result, timings):
+    if _profiler is not None:
+        _profiler.annotate(
+            prompt_length=len(prompt),
+            symptoms_detected=len(result.get("symptoms_detected", [])),
+            stages=timings,
+        )
+
+
+def _end_profile_on_close(response):
+    # Streamed bodies outlive teardown; end the profile once the body is closed
+    if _profiler is not None:
+        g.profile_on_close = True
+        response.call_on_close(_profiler.end_request)
+    return response
+
+
+def _record_analysis(prompt, result, elapsed_ms):
+    user_id = auth.user_from_header(request.headers.get("Authorization"))
+    history_store.record(prompt, result, user_id=user_id)
+    if _shadow is not None:
+        _shadow.observe(prompt, result, elapsed_ms)
+
+
+def _ndjson(event, data):
+    return app.json.dumps({"event": event, "data": data}) + "\n"
+
+
 @app.route("/api/diseases", methods=["GET"])
 def diseases():
     try:
@@ -57,3 +203,91 @@ def diseases():
         return jsonify({"diseases": diseases_list, "count": len(diseases_list)}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+
+def _history_ctx():
+    store = history_store.get_store()
+    if store is None:
+        return None, (jsonify({"error": "Server-side history is not enabled."}), 503)
+    user_id = auth.user_from_header(request.headers.get("Authorization"))
+    if user_id is None:
+        return None, (jsonify({"error": "Authentication required."}), 401)
+    return (store, user_id), None
+
+
+@app.route("/api/history", methods=["GET"])
+def history():
+    ctx, err = _history_ctx()
+    if err:
+        return err
+    store, user_id = ctx
+    try:
+        limit = int(request.args.get("limit", 20))
+        page  = store.list_page(user_id, limit=limit, cursor=request.args.get("cursor"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(page), 200
+
+
+@app.route("/api/history/summary", methods=["GET"])
+def history_summary():
+    ctx, err = _history_ctx()
+    if err:
+        return err
+    store, user_id = ctx
+    try:
+        top_n = int(request.args.get("top", 5))
+    except ValueError:
+        return jsonify({"error": "'top' must be an integer."}), 400
+    return jsonify(store.summary(user_id, top_n=top_n)), 200
+
+
+@app.route("/api/history/<int:analysis_id>", methods=["GET"])
+def history_detail(analysis_id):
+    ctx, err = _history_ctx()
+    if err:
+        return err
+    store, user_id = ctx
+    rec = store.get(user_id, analysis_id)
+    if rec is None:
+        return jsonify({"error": "Analysis not found."}), 404
+    return jsonify(rec), 200
+
+
+def _admin_guard():
+    token = os.environ.get("MEDITRIAGE_ADMIN_TOKEN", "")
+    given = request.headers.get("X-Admin-Token", "")
+    # Header values arrive as latin-1; compare bytes so non-ASCII input is a 403, not a 500
+    if not token or not hmac.compare_digest(given.encode("latin-1"), token.encode()):
+        return jsonify({"error": "Forbidden."}), 403
+    return None
+
+
+@app.route("/api/admin/profiles", methods=["GET"])
+def admin_profiles():
+    err = _admin_guard()
+    if err:
+        return err
+    if _profiler is None:
+        return jsonify({"error": "Profiling is not enabled (set MEDITRIAGE_PROFILE=1)."}), 404
+    return jsonify({"profiler": _profiler.info(), "profiles": _profiler.profiles()}), 200
+
+
+@app.route("/api/admin/profiles/collapsed", methods=["GET"])
+def admin_profiles_collapsed():
+    err = _admin_guard()
+    if err:
+        return err
+    if _profiler is None:
+        return jsonify({"error": "Profiling is not enabled (set MEDITRIAGE_PROFILE=1)."}), 404
+    return Response(_profiler.collapsed(request.args.get("id", type=int)), mimetype="text/plain")
+
+
+@app.route("/api/admin/shadow", methods=["GET"])
+def admin_shadow():
+    err = _admin_guard()
+    if err:
+        return err
+    if _shadow is None:
+        return jsonify({"error": "Shadow scoring is not enabled (set MEDITRIAGE_SHADOW_MODEL_DIR)."}), 404
+    return jsonify(_shadow.report()), 200
@@ -7,8 +7,12 @@ to the project root's model/ folder.
 
 import os
 import re
+import time
 import pickle
+import secrets
 import numpy as np
+from array import array
+from session_cache import SessionCache
 
 # On Vercel, __file__ is inside api/, so go up one level to reach model/
 BASE_DIR  = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -17,9 +21,11 @@ MODEL_DIR = os.path.join(BASE_DIR, "model")
 _model        = None
 _features     = None
 _disease_info = None
+_forest       = None
+_fast         = None
 
 def _load_artifacts():
-    global _model, _features, _disease_info
+    global _model, _features, _disease_info, _forest, _fast
     if _model is not None:
         return
 
@@ -41,6 +47,283 @@ def _load_artifacts():
     with open(disease_info_path, "rb") as f:
         _disease_info = pickle.load(f)
 
+    _forest = _build_forest_tables(_model)
+    _forest["emergency"] = np.array([
+        bool(_disease_info.get(d, {}).get("is_emergency", False))
+        for d in _features["label_encoder"].classes_
+    ])
+
+    # Optional cascade fast path; model folders trained before it existed lack it
+    fast_path = os.path.join(MODEL_DIR, "fast_model.pkl")
+    if os.path.exists(fast_path):
+        with open(fast_path, "rb") as f:
+            _fast = pickle.load(f)
+
+
+def _build_forest_tables(model) -> dict:
+    """
+    Flatten every tree into global node arrays with each node's normalised
+    class distribution, so the forest can be walked in numpy: all trees (or
+    any batch of them) advance one level per step.
+    """
+    left, right, feature, threshold, values, roots = [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for est in model.estimators_:
+        tree  = est.tree_
+        value = tree.value[:, 0, :]
+        value = value / value.sum(axis=1, keepdims=True)
+
+        is_leaf = tree.children_left == -1
+        left.append(np.where(is_leaf, -1, tree.children_left + offset))
+        right.append(np.where(is_leaf, -1, tree.children_right + offset))
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        values.append(value.astype(np.float32))
+        roots.append(offset)
+        offset   += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    values = np.concatenate(values)
+    roots  = np.array(roots)
+    left, right, feature, threshold = (
+        np.concatenate(left), np.concatenate(right), np.concatenate(feature), np.concatenate(threshold)
+    )
+    return {
+        "left":      left,
+        "right":     right,
+        "feature":   feature,
+        "threshold": threshold,
+        "value":     values,
+        "roots":     roots,
+        "bias":      values[roots].mean(axis=0),
+        "max_depth": max_depth,
+        "n_features": model.n_features_in_,
+        # Compact copies for walking a handful of trees in plain Python
+        "scalar":    (array("l", left), array("l", right), array("l", feature), array("d", threshold)),
+    }
+
+
+def _walk_to_leaves(node, x):
+    """Advance every entry of `node` (global node ids) to the leaf `x` reaches."""
+    t = _forest
+    for _ in range(t["max_depth"]):
+        active = np.flatnonzero(t["left"][node] != -1)
+        if active.size == 0:
+            break
+        n = node[active]
+        node[active] = np.where(x[t["feature"][n]] <= t["threshold"][n], t["left"][n], t["right"][n])
+    return node
+
+
+SCALAR_WALK_MAX = 32   # below this many trees a plain Python walk beats numpy
+
+
+def _walk_recording_paths(node, x):
+    """
+    Like _walk_to_leaves(), but also return a (len(node), n_features) bool
+    matrix marking which features each tree tested on its way down.
+    """
+    t       = _forest
+    on_path = np.zeros((len(node), t["n_features"]), dtype=bool)
+    if len(node) <= SCALAR_WALK_MAX:
+        # The numpy walk costs one step per level of the deepest tree no
+        # matter how few trees move, so small batches go tree by tree.
+        left, right, feature, threshold = t["scalar"]
+        xs = x.tolist()
+        for i, n in enumerate(node.tolist()):
+            feats = []
+            while left[n] != -1:
+                f = feature[n]
+                feats.append(f)
+                n = left[n] if xs[f] <= threshold[n] else right[n]
+            node[i] = n
+            on_path[i, feats] = True
+        return node, on_path
+
+    for _ in range(t["max_depth"]):
+        active = np.flatnonzero(t["left"][node] != -1)
+        if active.size == 0:
+            break
+        n    = node[active]
+        feat = t["feature"][n]
+        on_path[active, feat] = True
+        node[active] = np.where(x[feat] <= t["threshold"][n], t["left"][n], t["right"][n])
+    return node, on_path
+
+
+def _symptom_contributions(vec, class_idx: int, all_symptoms: list) -> dict:
+    """
+    Split the forest's probability for `class_idx` into a baseline (the
+    training prior at the tree roots) plus one share per symptom. Shares of
+    symptoms the patient did not mention are summed into `absent_symptoms`.
+    baseline + absent_symptoms + sum(symptoms) == probability.
+    """
+    t       = _forest
+    x       = np.asarray(vec, dtype=np.float64)
+    node    = t["roots"].copy()
+    contrib = np.zeros(len(all_symptoms))
+    for _ in range(t["max_depth"]):
+        active = np.flatnonzero(t["left"][node] != -1)
+        if active.size == 0:
+            break
+        n     = node[active]
+        feat  = t["feature"][n]
+        child = np.where(x[feat] <= t["threshold"][n], t["left"][n], t["right"][n])
+        moved = t["value"][child, class_idx] - t["value"][n, class_idx]
+        contrib += np.bincount(feat, weights=moved, minlength=len(contrib))
+        node[active] = child
+    contrib /= len(t["roots"])
+
+    present  = x.astype(bool)
+    symptoms = [
+        {"symptom": all_symptoms[i], "contribution": round(float(contrib[i]), 4)}
+        for i in np.flatnonzero(present)
+    ]
+    symptoms.sort(key=lambda s: s["contribution"], reverse=True)
+
+    return {
+        "baseline":        round(float(t["bias"][class_idx]), 4),
+        "symptoms":        symptoms,
+        "absent_symptoms": round(float(contrib[~present].sum()), 4),
+    }
+
+
+EARLY_EXIT_MODES = ("top1", "emergency")
+EARLY_EXIT_BATCH = 10   # trees evaluated between stopping checks
+
+
+def _decision_margin(totals, mode: str) -> float:
+    """
+    Lead of the current decision over its strongest competitor, in summed
+    tree probability. top1: best class vs runner-up. emergency: best
+    emergency class vs best non-emergency class (sign dropped).
+    """
+    if mode == "emergency":
+        flags = _forest["emergency"]
+        if flags.all() or not flags.any():
+            return np.inf  # every class gives the same answer
+        return abs(totals[flags].max() - totals[~flags].max())
+    second, first = np.partition(totals, -2)[-2:]
+    return first - second
+
+
+def _anytime_proba(vec, mode: str = "top1", delta: float = None):
+    """
+    Evaluate the forest EARLY_EXIT_BATCH trees at a time and stop once the
+    remaining trees can no longer change the decision. Each tree adds at
+    most 1 to any class, so a margin larger than the number of trees left
+    is final; this exact rule always agrees with full evaluation.
+
+    With `delta` set, also stop once a Hoeffding bound says the decision
+    matches that of the forest in expectation. Trees are treated as i.i.d.
+    draws; for a pair of classes each tree adds a difference in [-1, 1], so
+    the summed difference strays more than sqrt(2 * used * log(1 / d)) from
+    its mean with probability <= d. Both margins above are the leader's
+    lead over its closest competitor, i.e. the smallest of the pairwise
+    differences that decide the outcome. The stop is checked up to
+    ceil(n_trees / EARLY_EXIT_BATCH) times over K * (K - 1) ordered class
+    pairs, so d = delta / (checks * K * (K - 1)): a union bound that keeps
+    the overall chance of a wrong stop <= delta. Faster, but may disagree
+    with the full forest.
+
+    Returns (proba averaged over the trees used, trees_used).
+    """
+    t       = _forest
+    x       = np.asarray(vec, dtype=np.float64)
+    n_trees = len(t["roots"])
+    totals  = np.zeros(t["value"].shape[1])
+    used    = 0
+    if delta is not None:
+        n_checks = -(-n_trees // EARLY_EXIT_BATCH)
+        n_pairs  = len(totals) * (len(totals) - 1)
+        log_term = 2 * np.log(n_checks * n_pairs / delta)
+    while used < n_trees:
+        node = _walk_to_leaves(t["roots"][used:used + EARLY_EXIT_BATCH].copy(), x)
+        totals += t["value"][node].sum(axis=0)
+        used   += len(node)
+
+        margin = _decision_margin(totals, mode)
+        if margin > n_trees - used:
+            break
+        if delta is not None and margin > np.sqrt(used * log_term):
+            break
+    return totals / used, used
+
+
+CASCADE_ENABLED = os.environ.get("MEDITRIAGE_CASCADE", "").lower() in ("1", "true", "yes", "on")
+
+
+def _fast_proba(vec):
+    """
+    Stage 1 of the cascade: the calibrated logistic regression from
+    fast_model.pkl. Returns its class probabilities, or None when its top-1
+    margin or its emergency margin is below the thresholds picked on
+    validation data, in which case the forest decides.
+    """
+    f = _fast
+    z = (f["coef"] @ vec + f["intercept"]) / f["temperature"]
+    p = np.exp(z - z.max())
+    p /= p.sum()
+    second, first = np.partition(p, -2)[-2:]
+    if first - second < f["margin_threshold"]:
+        return None
+    if _decision_margin(p, "emergency") < f["emergency_threshold"]:
+        return None
+    return p
+
+_sessions = SessionCache(
+    max_bytes=int(os.environ.get("MEDITRIAGE_SESSION_MAX_BYTES", 32 << 20)),
+    ttl=float(os.environ.get("MEDITRIAGE_SESSION_TTL", 900)),
+)
+
+
+SESSION_NEW = "new"   # session_id that asks the server to start a session
+
+
+def _session_proba(session_id: str, vec):
+    """
+    Score `vec` for a refinement session. The session remembers the last
+    symptom vector, the leaf every tree reached and which features each
+    tree tested on that path. A tree can only land elsewhere if its path
+    tested a symptom that changed, so only those trees are walked again.
+
+    SESSION_NEW starts a session under a fresh unguessable id. Any other id
+    must be one issued here that has not expired: sessions hold a patient's
+    symptoms, so a client-chosen or guessed id must never reach one.
+
+    Returns (session_id, proba, trees_rescored, changed feature indices),
+    or None if `session_id` is unknown or expired.
+    """
+    t = _forest
+    x = np.asarray(vec, dtype=np.uint8)
+    if session_id == SESSION_NEW:
+        session_id, state = secrets.token_urlsafe(16), None
+    else:
+        state = _sessions.get(session_id)
+        if state is None:
+            return None
+    if state is None:
+        leaves, on_path = _walk_recording_paths(t["roots"].copy(), x)
+        changed = np.flatnonzero(x)
+        trees   = t["roots"]
+    else:
+        changed = np.flatnonzero(state["vec"] != x)
+        leaves  = state["leaves"]
+        on_path = np.unpackbits(state["paths"], axis=1, count=t["n_features"]).astype(bool)
+        trees   = np.flatnonzero(on_path[:, changed].any(axis=1))
+        if trees.size:
+            leaves = leaves.copy()
+            leaves[trees], on_path[trees] = _walk_recording_paths(t["roots"][trees].copy(), x)
+
+    _sessions.put(session_id, {"vec": x, "leaves": leaves, "paths": np.packbits(on_path, axis=1)})
+    proba = t["value"][leaves].sum(axis=0, dtype=np.float64) / len(leaves)
+    return session_id, proba, len(trees), changed
+
+
+def session_info() -> dict:
+    """Session cache occupancy and hit/eviction counters."""
+    return _sessions.info()
+
 
 def _normalise(text: str) -> str:
     text = text.lower()
@@ -119,27 +402,72 @@ def _generate_analysis(disease, found_symptoms, info, confidence):
     return "\n".join(lines)
 
 
-def predict(prompt: str) -> dict:
+def _lap(timings, stage: str, since):
+    """Record ms elapsed since `since` under `stage`; no-op without a timings dict."""
+    if timings is None:
+        return None
+    now = time.perf_counter()
+    timings[stage] = round((now - since) * 1000, 3)
+    return now
+
+
+def predict_stream(prompt: str, explain: bool = False, early_exit: str = None,
+                   early_exit_delta: float = None, session_id: str = None,
+                   timings: dict = None):
     _load_artifacts()
     all_symptoms = _features["symptoms"]
     le           = _features["label_encoder"]
 
     if not prompt or not prompt.strip():
-        return {"error": "Please enter your symptoms."}
+        yield "error", {"error": "Please enter your symptoms."}
+        return
+    if early_exit is not None and early_exit not in EARLY_EXIT_MODES:
+        yield "error", {"error": f"early_exit must be one of {list(EARLY_EXIT_MODES)}."}
+        return
+    if early_exit_delta is not None and not (
+            isinstance(early_exit_delta, (int, float)) and 0 < early_exit_delta < 1):
+        yield "error", {"error": "early_exit_delta must be between 0 and 1."}
+        return
+    if early_exit_delta is not None and not early_exit:
+        yield "error", {"error": "early_exit_delta requires early_exit."}
+        return
+    if session_id is not None and early_exit:
+        yield "error", {"error": "session_id cannot be combined with early_exit."}
+        return
 
+    t = time.perf_counter() if timings is not None else None
     vec, found_symptoms = _encode_prompt(prompt, all_symptoms)
-    proba   = _model.predict_proba([vec])[0]
+    t = _lap(timings, "extract_ms", t)
+    trees_used = session = None
+    scored_by  = "forest"
+    if session_id is not None:
+        scored = _session_proba(str(session_id), vec)
+        if scored is None:
+            yield "error", {"error": f"Unknown or expired session_id. Send \"{SESSION_NEW}\" to start a session."}
+            return
+        session_id, proba, rescored, changed = scored
+        session = {
+            "id":               session_id,
+            "trees_rescored":   rescored,
+            "symptoms_added":   [all_symptoms[i] for i in changed if vec[i]],
+            "symptoms_removed": [all_symptoms[i] for i in changed if not vec[i]],
+        }
+    elif early_exit:
+        proba, trees_used = _anytime_proba(vec, early_exit, early_exit_delta)
+    else:
+        proba = None
+        if _fast is not None and CASCADE_ENABLED and not explain:
+            proba = _fast_proba(vec)
+        if proba is None:
+            proba = _model.predict_proba([vec])[0]
+        else:
+            scored_by = "fast"
     top_idx = np.argsort(proba)[::-1][:3]
 
     best_idx   = top_idx[0]
     disease    = le.inverse_transform([best_idx])[0]
     confidence = float(proba[best_idx])
 
-    top_predictions = [
-        {"disease": le.inverse_transform([i])[0], "probability": round(float(proba[i]), 4)}
-        for i in top_idx
-    ]
-
     info = _disease_info.get(disease, {
         "description":    "A medical condition.",
         "precautions":    ["Consult a doctor", "Rest well", "Stay hydrated"],
@@ -148,17 +476,49 @@ def predict(prompt: str) -> dict:
         "is_emergency":   False,
     })
 
-    analysis = _generate_analysis(disease, found_symptoms, info, confidence)
-
-    return {
+    verdict = {
         "predicted_disease":  disease,
         "confidence":         round(confidence, 4),
         "confidence_label":   _confidence_label(confidence),
         "risk_level":         info["risk_level"],
         "is_emergency":       info["is_emergency"],
         "severity_score":     round(info["severity_score"], 2),
-        "symptoms_detected":  found_symptoms,
-        "precautions":        info["precautions"],
-        "detailed_analysis":  analysis,
-        "top_predictions":    top_predictions,
+        "scored_by":          scored_by,
+    }
+    if trees_used is not None:
+        verdict["trees_used"] = trees_used
+    if session is not None:
+        verdict["session"] = session
+    _lap(timings, "score_ms", t)
+    yield "verdict", verdict
+
+    yield "predictions", {
+        "top_predictions": [
+            {"disease": le.inverse_transform([i])[0], "probability": round(float(proba[i]), 4)}
+            for i in top_idx
+        ],
+        "symptoms_detected": found_symptoms,
     }
+
+    t = time.perf_counter() if timings is not None else None
+    analysis = {
+        "precautions":       info["precautions"],
+        "detailed_analysis": _generate_analysis(disease, found_symptoms, info, confidence),
+    }
+    t = _lap(timings, "report_ms", t)
+    if explain:
+        analysis["symptom_contributions"] = _symptom_contributions(vec, best_idx, all_symptoms)
+        _lap(timings, "explain_ms", t)
+    yield "analysis", analysis
+
+
+def predict(prompt: str, explain: bool = False, early_exit: str = None,
+            early_exit_delta: float = None, session_id: str = None,
+            timings: dict = None) -> dict:
+    result = {}
+    for event, part in predict_stream(prompt, explain, early_exit, early_exit_delta,
+                                      session_id, timings):
+        if event == "error":
+            return part
+        result.update(part)
+    return result
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+MediTriageAI - Shadow Scoring (Vercel version)
+Identical to backend/shadow.py.
+
+Scores a sampled fraction of live /analyze prompts against a candidate
+model (a second model/ folder) without touching user latency.
+
+The candidate runs in a separate worker process (this file run as a
+script), so its inference never competes with request threads for the GIL.
+Prompts wait in a bounded in-memory queue; when it is full the sample is
+dropped instead of blocking. A pump thread feeds the worker one JSON line at
+a time over stdin/stdout and folds its answers into disagreement counters
+(top-1 disease, risk_level, is_emergency), a latency ratio and a window of
+recent comparisons. Each result can also be appended to a size-rotated
+JSON-lines log.
+
+Only plain requests are sampled. Results with explain, early_exit or
+session_id took a different scoring path than the worker's plain predict(),
+so comparing them would mix that difference into the disagreement rates.
+
+The shadow must not slow live traffic. The worker runs at the lowest CPU
+priority and, when the machine has more than one core, is pinned to the last
+one. The pump also caps the worker's duty cycle: after a job that took t ms
+it waits t * (1 - duty) / duty ms before sending the next. Samples arriving
+faster than that fill the queue and are dropped.
+
+Environment:
+  MEDITRIAGE_SHADOW_MODEL_DIR    candidate artifacts folder (unset = disabled)
+  MEDITRIAGE_SHADOW_SAMPLE_RATE  fraction of prompts to shadow (default 0.1)
+  MEDITRIAGE_SHADOW_QUEUE_SIZE   max prompts waiting for the worker (default 100)
+  MEDITRIAGE_SHADOW_WINDOW       recent comparisons kept in memory (default 200)
+  MEDITRIAGE_SHADOW_LOG          JSON-lines log path (optional, rotated at 10 MB)
+  MEDITRIAGE_SHADOW_MAX_DUTY     max fraction of one core the worker may use (default 0.25)
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import random
+import atexit
+import logging
+import threading
+import subprocess
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+COMPARED_FIELDS = ("predicted_disease", "risk_level", "is_emergency")
+
+# Present only when the request used explain / early_exit / session_id
+NON_PLAIN_FIELDS = ("symptom_contributions", "trees_used", "session")
+
+
+# ─── Server side ──────────────────────────────────────────────────────────────
+
+class ShadowScorer:
+    """Samples prompts to a candidate-model worker and aggregates the comparison."""
+
+    def __init__(self, candidate_dir: str, sample_rate: float = 0.1, queue_size: int = 100,
+                 window: int = 200, log_path: str = None, max_duty: float = 0.25):
+        self.candidate_dir = candidate_dir
+        self.sample_rate   = sample_rate
+        self.max_duty      = min(1.0, max(0.01, max_duty))
+        self.recent        = deque(maxlen=window)
+        self.stats = {
+            "sampled": 0, "dropped": 0, "skipped": 0, "scored": 0, "errors": 0,
+            "disagree": {f: 0 for f in COMPARED_FIELDS},
+            "primary_ms_total": 0.0, "shadow_ms_total": 0.0,
+        }
+        self.fatal = None
+        self._lock = threading.Lock()
+
+        self._log = None
+        if log_path:
+            self._log = logging.getLogger("meditriage.shadow")
+            self._log.propagate = False
+            self._log.setLevel(logging.INFO)
+            handler = RotatingFileHandler(log_path, maxBytes=10 << 20, backupCount=3)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._log.addHandler(handler)
+
+        self._jobs = queue.Queue(maxsize=queue_size)
+        self._proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), candidate_dir],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1,
+        )
+        self._pump = threading.Thread(target=self._run, name="shadow-pump", daemon=True)
+        self._pump.start()
+
+    def _count(self, key: str, n=1) -> None:
+        with self._lock:
+            self.stats[key] += n
+
+    def observe(self, prompt: str, result: dict, primary_ms: float) -> None:
+        """Called on the request path: at most a random() and a non-blocking put."""
+        if self.fatal is not None or random.random() >= self.sample_rate:
+            return
+        if any(k in result for k in NON_PLAIN_FIELDS):
+            self._count("skipped")
+            return
+        primary = {k: result.get(k) for k in COMPARED_FIELDS}
+        try:
+            self._jobs.put_nowait((prompt, primary, primary_ms))
+            self._count("sampled")
+        except queue.Full:
+            self._count("dropped")
+
+    def _run(self) -> None:
+        try:
+            ready = json.loads(self._proc.stdout.readline() or '{"fatal": "worker exited"}')
+        except (OSError, ValueError) as e:
+            ready = {"fatal": repr(e)}
+        if "fatal" in ready:
+            self.fatal = ready["fatal"]
+            print(f"⚠️  Shadow model failed to load: {self.fatal}")
+            return
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            prompt, primary, primary_ms = job
+            try:
+                self._proc.stdin.write(json.dumps({"prompt": prompt}) + "\n")
+                line = self._proc.stdout.readline()
+                if not line:
+                    raise EOFError("worker exited")
+                reply = json.loads(line)
+            except (OSError, ValueError, EOFError) as e:
+                # Broken pipe / closed stream / garbled line: the worker is gone
+                self.fatal = f"worker failed: {e!r} (exit code {self._proc.poll()})"
+                print(f"⚠️  Shadow scoring stopped: {self.fatal}")
+                break
+            self._record(primary, primary_ms, reply)
+            if "ms" in reply and self.max_duty < 1.0:
+                time.sleep(reply["ms"] / 1000 * (1 - self.max_duty) / self.max_duty)
+
+    def _record(self, primary: dict, primary_ms: float, reply: dict) -> None:
+        with self._lock:
+            if "error" in reply:
+                self.stats["errors"] += 1
+                return
+            shadow = reply["result"]
+            item = {
+                "primary":    primary,
+                "shadow":     shadow,
+                "disagree":   [f for f in COMPARED_FIELDS if primary[f] != shadow[f]],
+                "primary_ms": round(primary_ms, 3),
+                "shadow_ms":  reply["ms"],
+            }
+            self.stats["scored"] += 1
+            for f in item["disagree"]:
+                self.stats["disagree"][f] += 1
+            self.stats["primary_ms_total"] += item["primary_ms"]
+            self.stats["shadow_ms_total"]  += item["shadow_ms"]
+            self.recent.append(item)
+        if self._log is not None:
+            self._log.info(json.dumps({"ts": time.time(), **item}, default=str))
+
+    def report(self) -> dict:
+        with self._lock:
+            s      = self.stats
+            scored = s["scored"]
+            return {
+                "candidate_dir": self.candidate_dir,
+                "sample_rate":   self.sample_rate,
+                "worker_alive":  self._proc.poll() is None,
+                "fatal":         self.fatal,
+                "max_duty":      self.max_duty,
+                "sampled":       s["sampled"],
+                "dropped":       s["dropped"],
+                "skipped":       s["skipped"],
+                "scored":        scored,
+                "errors":        s["errors"],
+                "disagreement_rate": {
+                    f: round(n / scored, 4) if scored else None for f, n in s["disagree"].items()
+                },
+                "relative_latency": (
+                    round(s["shadow_ms_total"] / s["primary_ms_total"], 3)
+                    if s["primary_ms_total"] else None
+                ),
+                "recent": list(self.recent)[-20:],
+            }
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Let the pump finish queued prompts, then stop the worker."""
+        try:
+            self._jobs.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._pump.join(timeout)
+        try:
+            self._proc.stdin.close()
+            self._proc.wait(timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            self._proc.kill()
+
+
+def from_env():
+    """Start a ShadowScorer from MEDITRIAGE_SHADOW_* variables, or return None if disabled."""
+    candidate_dir = os.environ.get("MEDITRIAGE_SHADOW_MODEL_DIR")
+    if not candidate_dir:
+        return None
+    scorer = ShadowScorer(
+        os.path.abspath(candidate_dir),
+        sample_rate=float(os.environ.get("MEDITRIAGE_SHADOW_SAMPLE_RATE", 0.1)),
+        queue_size=int(os.environ.get("MEDITRIAGE_SHADOW_QUEUE_SIZE", 100)),
+        window=int(os.environ.get("MEDITRIAGE_SHADOW_WINDOW", 200)),
+        log_path=os.environ.get("MEDITRIAGE_SHADOW_LOG"),
+        max_duty=float(os.environ.get("MEDITRIAGE_SHADOW_MAX_DUTY", 0.25)),
+    )
+    atexit.register(scorer.close)
+    return scorer
+
+
+# ─── Worker process ───────────────────────────────────────────────────────────
+
+def _worker_main(candidate_dir: str) -> None:
+    """
+    Load the candidate artifacts, print a ready line, then answer one JSON
+    line per prompt read from stdin until it closes.
+    """
+    # Replies own stdout; anything else the model code prints goes to stderr
+    out, sys.stdout = sys.stdout, sys.stderr
+    # Yield the CPU to request threads whenever both want it, and keep off
+    # the other cores when there are several
+    if hasattr(os, "nice"):
+        os.nice(19)
+    if hasattr(os, "sched_setaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+        if len(cpus) > 1:
+            os.sched_setaffinity(0, {cpus[-1]})
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import model_utils
+    model_utils.MODEL_DIR = candidate_dir
+    try:
+        model_utils._load_artifacts()
+    except Exception as e:
+        print(json.dumps({"fatal": repr(e)}), file=out, flush=True)
+        return
+    print(json.dumps({"ready": True}), file=out, flush=True)
+
+    for line in sys.stdin:
+        prompt = json.loads(line)["prompt"]
+        t = time.perf_counter()
+        try:
+            result = model_utils.predict(prompt)
+            ms     = round((time.perf_counter() - t) * 1000, 3)
+            # Only the compared fields travel back, to keep the pump's parsing cheap
+            reply  = {"result": {k: result.get(k) for k in COMPARED_FIELDS}, "ms": ms}
+        except Exception as e:
+            reply  = {"error": repr(e)}
+        print(json.dumps(reply, default=str), file=out, flush=True)
+
+
+if __name__ == "__main__":
+    _worker_main(sys.argv[1])
@@ -7,23 +7,76 @@ REST API that exposes the ML model for patient symptom analysis.
 Endpoints:
   GET  /health           → health check
   POST /analyze          → analyze patient symptoms
+  POST /analyze/stream   → same, streamed as NDJSON (verdict first)
   GET  /diseases         → list all known diseases
+  GET  /history          → paginated analysis history for a user
+  GET  /history/summary  → per-user rollups (risk counts, top diseases)
+  GET  /history/<id>     → one full past analysis
+  GET  /admin/profiles            → slow-request profiles (admin token)
+  GET  /admin/profiles/collapsed  → flamegraph collapsed stacks (admin token)
+  GET  /admin/shadow              → candidate-model shadow comparison (admin token)
 """
 
 import os
 import sys
-from flask import Flask, request, jsonify
+import hmac
+import time
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 
 # Add backend directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 import model_utils
+import history_store
+import profiler
+import shadow
+import guard
+import auth
 
 app = Flask(__name__)
 CORS(app, origins="*")
 
+# Per-client rate limits and size caps for /analyze, checked before parsing.
+# MAX_CONTENT_LENGTH also stops chunked bodies that send no Content-Length.
+_guard = guard.from_env()
+app.config["MAX_CONTENT_LENGTH"] = _guard.max_body_bytes or None
+
+# Slow-request profiling: None unless MEDITRIAGE_PROFILE is set, in which
+# case no hooks are registered and requests pay nothing.
+_profiler = profiler.from_env()
+
+# Candidate-model shadow scoring: None unless MEDITRIAGE_SHADOW_MODEL_DIR is set
+_shadow = shadow.from_env()
+
+if _profiler is not None:
+    @app.before_request
+    def _profile_start():
+        _profiler.start_request(method=request.method, path=request.path)
+
+    @app.after_request
+    def _profile_status(response):
+        _profiler.annotate(status=response.status_code)
+        return response
+
+    @app.teardown_request
+    def _profile_end(exc):
+        if exc is None and g.get("profile_on_close"):
+            return  # a streamed body is still being sent; see _end_profile_on_close()
+        _profiler.end_request(**({"error": repr(exc)} if exc is not None else {}))
+
 # ─── Routes ───────────────────────────────────────────────────────────────────
 
+def _guard_response(err):
+    status, body, headers = err
+    return jsonify(body), status, headers
+
+
+@app.errorhandler(413)
+def too_large(e):
+    return _guard_response((413, {"error": "Request body too large.",
+                                  "max_bytes": _guard.max_body_bytes}, {}))
+
+
 @app.route("/health", methods=["GET"])
 def health():
     return jsonify({
@@ -39,7 +92,15 @@ def analyze():
     Analyze patient symptoms from free-text prompt.
 
     Request body (JSON):
-        { "prompt": "I have chest pain and shortness of breath..." }
+        { "prompt": "I have chest pain and shortness of breath...",
+          "explain": false,          (optional, adds symptom_contributions)
+          "early_exit": "top1",      (optional, "top1" | "emergency"; adds trees_used)
+          "early_exit_delta": 0.05,  (optional, statistical early stop)
+          "session_id": "new"        (optional, incremental re-scoring; adds session.
+                                      "new" starts one, then send back session.id) }
+
+    With server-side history enabled, the analysis is recorded for the user
+    in the `Authorization: Bearer <Supabase access token>` header, if any.
 
     Response (JSON):
         {
@@ -55,21 +116,26 @@ def analyze():
             "top_predictions": [
                 {"disease": "Heart attack", "probability": 0.87},
                 ...
-            ]
+            ],
+            "symptom_contributions": {          (only with "explain": true)
+                "baseline": 0.02,
+                "symptoms": [{"symptom": "chest_pain", "contribution": 0.41}, ...],
+                "absent_symptoms": 0.05
+            }
         }
     """
-    data = request.get_json(silent=True)
-    if not data or "prompt" not in data:
-        return jsonify({"error": "Missing 'prompt' in request body."}), 400
-
-    prompt = str(data["prompt"]).strip()
-    if not prompt:
-        return jsonify({"error": "Prompt cannot be empty."}), 400
+    data, prompt, err = _read_analyze_request()
+    if err:
+        return err
 
+    timings = {} if _profiler is not None else None
     try:
-        result = model_utils.predict(prompt)
+        started = time.perf_counter()
+        result = model_utils.predict(prompt, timings=timings, **_predict_options(data))
+        _annotate_profile(prompt, result, timings)
         if "error" in result:
             return jsonify(result), 400
+        _record_analysis(prompt, result, (time.perf_counter() - started) * 1000)
         return jsonify(result), 200
     except FileNotFoundError as e:
         return jsonify({
@@ -83,6 +149,139 @@ def analyze():
         }), 500
 
 
+@app.route("/analyze/stream", methods=["POST"])
+def analyze_stream():
+    """
+    Same request body as /analyze, answered as NDJSON: one line
+    {"event": ..., "data": {...}} per part, flushed as soon as it is ready.
+
+        verdict      predicted_disease, confidence, risk_level, is_emergency, ...
+        predictions  top_predictions, symptoms_detected
+        analysis     precautions, detailed_analysis (+ symptom_contributions)
+
+    Merging the data objects gives the /analyze response. Invalid input is
+    still answered with a plain JSON error and a 4xx status; a failure after
+    the verdict has been sent ends the stream with an "error" event.
+    """
+    data, prompt, err = _read_analyze_request()
+    if err:
+        return err
+
+    timings = {} if _profiler is not None else None
+    started = time.perf_counter()
+    parts   = model_utils.predict_stream(prompt, timings=timings, **_predict_options(data))
+    try:
+        event, first = next(parts)
+    except FileNotFoundError as e:
+        return jsonify({
+            "error": "Model not found. Please train the model first.",
+            "details": str(e)
+        }), 503
+    except Exception as e:
+        return jsonify({
+            "error": "An internal error occurred during analysis.",
+            "details": str(e)
+        }), 500
+    if event == "error":
+        _annotate_profile(prompt, first, timings)
+        return jsonify(first), 400
+    busy = time.perf_counter() - started
+
+    @stream_with_context
+    def generate():
+        nonlocal busy
+        result = dict(first)
+        yield _ndjson(event, first)
+        while True:
+            # Time spent writing to the client is not model latency
+            t = time.perf_counter()
+            try:
+                part = next(parts, None)
+            except Exception as e:
+                yield _ndjson("error", {
+                    "error": "An internal error occurred during analysis.",
+                    "details": str(e)
+                })
+                return
+            busy += time.perf_counter() - t
+            if part is None:
+                break
+            result.update(part[1])
+            yield _ndjson(*part)
+        _annotate_profile(prompt, result, timings)
+        _record_analysis(prompt, result, busy * 1000)
+
+    # Teardown runs before a streamed body is sent, so the profile ends on close
+    _annotate_profile(prompt, first, timings)
+    return _end_profile_on_close(Response(generate(), mimetype="application/x-ndjson",
+                                          headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}))
+
+
+def _read_analyze_request():
+    """
+    Guard checks and body validation shared by /analyze and /analyze/stream.
+    Returns (data, prompt, None), or (None, None, error response).
+    """
+    client = _guard.client_key(request.remote_addr, request.headers.get("X-Forwarded-For"))
+    err = _guard.check_request(client, request.content_length)
+    if err:
+        return None, None, _guard_response(err)
+
+    data = request.get_json(silent=True)
+    if not data or "prompt" not in data:
+        return None, None, (jsonify({"error": "Missing 'prompt' in request body."}), 400)
+
+    prompt = str(data["prompt"]).strip()
+    if not prompt:
+        return None, None, (jsonify({"error": "Prompt cannot be empty."}), 400)
+    err = _guard.check_prompt(prompt)
+    if err:
+        return None, None, _guard_response(err)
+    return data, prompt, None
+
+
+def _predict_options(data: dict) -> dict:
+    return {
+        "explain":          bool(data.get("explain")),
+        "early_exit":       data.get("early_exit"),
+        "early_exit_delta": data.get("early_exit_delta"),
+        "session_id":       data.get("session_id"),
+    }
+
+
+def _annotate_profile(prompt: str, result: dict, timings) -> None:
+    if _profiler is not None:
+        _profiler.annotate(
+            prompt_length=len(prompt),
+            symptoms_detected=len(result.get("symptoms_detected", [])),
+            stages=timings,
+        )
+
+
+def _end_profile_on_close(response: Response) -> Response:
+    """
+    End the request's profile when the server closes the response body rather
+    than at teardown, so a streamed body's generator can still annotate it.
+    """
+    if _profiler is not None:
+        g.profile_on_close = True
+        response.call_on_close(_profiler.end_request)
+    return response
+
+
+def _record_analysis(prompt: str, result: dict, elapsed_ms: float) -> None:
+    # Queued for the background writer / shadow worker; never blocks the response.
+    # The history owner comes only from the verified token, never from the body.
+    user_id = auth.user_from_header(request.headers.get("Authorization"))
+    history_store.record(prompt, result, user_id=user_id)
+    if _shadow is not None:
+        _shadow.observe(prompt, result, elapsed_ms)
+
+
+def _ndjson(event: str, data: dict) -> str:
+    return app.json.dumps({"event": event, "data": data}) + "\n"
+
+
 @app.route("/diseases", methods=["GET"])
 def list_diseases():
     """Return all diseases the model knows about."""
@@ -104,6 +303,115 @@ def list_diseases():
         return jsonify({"error": str(e)}), 500
 
 
+def _history_store_or_error():
+    store = history_store.get_store()
+    if store is None:
+        return None, (jsonify({"error": "Server-side history is not enabled."}), 503)
+    # The owner comes only from the verified Supabase token, never from the request
+    user_id = auth.user_from_header(request.headers.get("Authorization"))
+    if user_id is None:
+        return None, (jsonify({"error": "Authentication required."}), 401)
+    return (store, user_id), None
+
+
+@app.route("/history", methods=["GET"])
+def history():
+    """
+    List the signed-in user's past analyses, newest first, without the
+    full report. Requires `Authorization: Bearer <Supabase access token>`.
+
+    Query params:
+        limit     page size (1-100, default 20)
+        cursor    `next_cursor` from the previous page
+    """
+    ctx, err = _history_store_or_error()
+    if err:
+        return err
+    store, user_id = ctx
+    try:
+        limit = int(request.args.get("limit", 20))
+        page  = store.list_page(user_id, limit=limit, cursor=request.args.get("cursor"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(page), 200
+
+
+@app.route("/history/summary", methods=["GET"])
+def history_summary():
+    """Per-user totals, counts per risk level and most frequent diseases."""
+    ctx, err = _history_store_or_error()
+    if err:
+        return err
+    store, user_id = ctx
+    try:
+        top_n = int(request.args.get("top", 5))
+    except ValueError:
+        return jsonify({"error": "'top' must be an integer."}), 400
+    return jsonify(store.summary(user_id, top_n=top_n)), 200
+
+
+@app.route("/history/<int:analysis_id>", methods=["GET"])
+def history_detail(analysis_id):
+    """One full past analysis, including the detailed report."""
+    ctx, err = _history_store_or_error()
+    if err:
+        return err
+    store, user_id = ctx
+    rec = store.get(user_id, analysis_id)
+    if rec is None:
+        return jsonify({"error": "Analysis not found."}), 404
+    return jsonify(rec), 200
+
+
+# ─── Admin ────────────────────────────────────────────────────────────────────
+
+def _admin_guard():
+    """403 unless the X-Admin-Token header matches MEDITRIAGE_ADMIN_TOKEN."""
+    token = os.environ.get("MEDITRIAGE_ADMIN_TOKEN", "")
+    given = request.headers.get("X-Admin-Token", "")
+    # Header values arrive as latin-1; compare bytes so non-ASCII input is a 403, not a 500
+    if not token or not hmac.compare_digest(given.encode("latin-1"), token.encode()):
+        return jsonify({"error": "Forbidden."}), 403
+    return None
+
+
+@app.route("/admin/profiles", methods=["GET"])
+def admin_profiles():
+    """Kept slow/sampled request profiles, newest first (without stacks)."""
+    err = _admin_guard()
+    if err:
+        return err
+    if _profiler is None:
+        return jsonify({"error": "Profiling is not enabled (set MEDITRIAGE_PROFILE=1)."}), 404
+    return jsonify({"profiler": _profiler.info(), "profiles": _profiler.profiles()}), 200
+
+
+@app.route("/admin/profiles/collapsed", methods=["GET"])
+def admin_profiles_collapsed():
+    """
+    Collapsed stacks for flamegraph.pl / speedscope. Pass ?id=<profile id>
+    for a single request; otherwise every buffered profile is merged.
+    """
+    err = _admin_guard()
+    if err:
+        return err
+    if _profiler is None:
+        return jsonify({"error": "Profiling is not enabled (set MEDITRIAGE_PROFILE=1)."}), 404
+    text = _profiler.collapsed(request.args.get("id", type=int))
+    return Response(text, mimetype="text/plain")
+
+
+@app.route("/admin/shadow", methods=["GET"])
+def admin_shadow():
+    """Disagreement rates and relative latency of the shadow candidate model."""
+    err = _admin_guard()
+    if err:
+        return err
+    if _shadow is None:
+        return jsonify({"error": "Shadow scoring is not enabled (set MEDITRIAGE_SHADOW_MODEL_DIR)."}), 404
+    return jsonify(_shadow.report()), 200
+
+
 # ─── Main ─────────────────────────────────────────────────────────────────────
 
 if __name__ == "__main__":
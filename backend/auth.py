@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+MediTriageAI - Request Authentication
+=======================================
+Resolves the signed-in user of a request from the Supabase access token the
+frontend already holds, sent as `Authorization: Bearer <token>`. The token
+is an HS256 JWT signed with the project's JWT secret; the user id is its
+`sub` claim. Nothing the client puts in a body or query string is trusted
+as an identity.
+
+Environment:
+  MEDITRIAGE_SUPABASE_JWT_SECRET    project JWT secret (unset = no request is authenticated)
+  MEDITRIAGE_SUPABASE_JWT_AUDIENCE  required "aud" claim (default "authenticated")
+"""
+
+import os
+import hmac
+import json
+import time
+import base64
+import hashlib
+
+
+def _b64url_decode(part: str) -> bytes:
+    return base64.urlsafe_b64decode(part + "=" * (-len(part) % 4))
+
+
+def verify_token(token: str, secret: str, audience: str = "authenticated", now: float = None):
+    """
+    Return the `sub` claim of a valid, unexpired HS256 token, else None.
+    Never raises on malformed input.
+    """
+    if not token or not secret:
+        return None
+    try:
+        header_b64, payload_b64, sig_b64 = token.split(".")
+        header  = json.loads(_b64url_decode(header_b64))
+        payload = json.loads(_b64url_decode(payload_b64))
+        sig     = _b64url_decode(sig_b64)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(header, dict) or not isinstance(payload, dict) or header.get("alg") != "HS256":
+        return None
+
+    expected = hmac.new(secret.encode(), f"{header_b64}.{payload_b64}".encode(), hashlib.sha256).digest()
+    if not hmac.compare_digest(sig, expected):
+        return None
+
+    exp = payload.get("exp")
+    if not isinstance(exp, (int, float)) or exp <= (time.time() if now is None else now):
+        return None
+    aud = payload.get("aud")
+    if audience and audience not in (aud if isinstance(aud, list) else [aud]):
+        return None
+    sub = payload.get("sub")
+    return sub if isinstance(sub, str) and sub else None
+
+
+def user_from_header(authorization: str):
+    """User id from an `Authorization: Bearer <token>` header value, or None."""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer":
+        return None
+    return verify_token(
+        token.strip(),
+        os.environ.get("MEDITRIAGE_SUPABASE_JWT_SECRET", ""),
+        os.environ.get("MEDITRIAGE_SUPABASE_JWT_AUDIENCE", "authenticated"),
+    )
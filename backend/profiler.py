@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+MediTriageAI - Slow-request Profiler
+======================================
+Opt-in sampling profiler for the Flask apps. While enabled, a background
+thread snapshots the stack of every thread that is serving a request. When
+a request finishes, its samples are kept only if it was slower than the
+threshold or picked by the random sample rate; otherwise they are thrown
+away. Kept profiles go into a bounded ring buffer and can be exported in
+the collapsed-stack format used by flamegraph.pl / speedscope.
+
+When MEDITRIAGE_PROFILE is not set, from_env() returns None and the apps
+register no hooks at all.
+
+Environment:
+  MEDITRIAGE_PROFILE               1 to enable (default off)
+  MEDITRIAGE_PROFILE_THRESHOLD_MS  keep requests slower than this (default 500)
+  MEDITRIAGE_PROFILE_SAMPLE_RATE   also keep this fraction of requests (default 0)
+  MEDITRIAGE_PROFILE_INTERVAL_MS   stack sampling interval (default 5)
+  MEDITRIAGE_PROFILE_CAPACITY      profiles kept in the ring buffer (default 50)
+"""
+
+import os
+import sys
+import time
+import random
+import itertools
+import threading
+from collections import Counter, deque
+from datetime import datetime, timezone
+
+
+def _collapse(frame, max_depth: int = 64) -> str:
+    """Render a frame chain as 'outer;...;inner' (root first)."""
+    names = []
+    while frame is not None and len(names) < max_depth:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class _RequestProfile:
+    __slots__ = ("meta", "start", "stacks", "samples")
+
+    def __init__(self, meta: dict):
+        self.meta    = meta
+        self.start   = time.perf_counter()
+        self.stacks  = Counter()
+        self.samples = 0
+
+
+class SamplingProfiler:
+    """Per-request stack sampler with a bounded ring buffer of kept profiles."""
+
+    def __init__(self, threshold_ms: float = 500.0, sample_rate: float = 0.0,
+                 interval_ms: float = 5.0, capacity: int = 50):
+        self.threshold_ms = threshold_ms
+        self.sample_rate  = sample_rate
+        self.interval     = interval_ms / 1000.0
+        self._profiles    = deque(maxlen=capacity)
+        self._active      = {}              # thread id -> _RequestProfile
+        self._lock        = threading.Lock()
+        self._ids         = itertools.count(1)
+        self.stats        = {"requests": 0, "kept": 0}
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    # ── Sampler thread ──
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.items())
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for tid, prof in active:
+                frame = frames.get(tid)
+                if frame is not None and tid != own:
+                    prof.stacks[_collapse(frame)] += 1
+                    prof.samples += 1
+
+    # ── Request hooks ──
+
+    def start_request(self, **meta) -> None:
+        with self._lock:
+            self._active[threading.get_ident()] = _RequestProfile(meta)
+
+    def annotate(self, **fields) -> None:
+        """Attach extra fields (prompt length, stage timings...) to the current request."""
+        prof = self._active.get(threading.get_ident())
+        if prof is not None:
+            prof.meta.update(fields)
+
+    def end_request(self, **meta) -> None:
+        with self._lock:
+            prof = self._active.pop(threading.get_ident(), None)
+        if prof is None:
+            return
+        duration_ms = (time.perf_counter() - prof.start) * 1000
+        self.stats["requests"] += 1
+
+        if duration_ms >= self.threshold_ms:
+            reason = "slow"
+        elif self.sample_rate and random.random() < self.sample_rate:
+            reason = "sampled"
+        else:
+            return
+
+        self.stats["kept"] += 1
+        self._profiles.append({
+            "id":          next(self._ids),
+            "reason":      reason,
+            "finished_at": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "duration_ms": round(duration_ms, 2),
+            "samples":     prof.samples,
+            **prof.meta,
+            **meta,
+            "stacks":      dict(prof.stacks),
+        })
+
+    # ── Export ──
+
+    def profiles(self) -> list:
+        """Kept profiles, newest first, without their stacks."""
+        return [
+            {k: v for k, v in p.items() if k != "stacks"}
+            for p in reversed(self._profiles)
+        ]
+
+    def collapsed(self, profile_id: int = None) -> str:
+        """
+        Collapsed stacks ('frame;frame;frame count' per line) for one profile,
+        or merged across the whole buffer when profile_id is None.
+        """
+        merged = Counter()
+        for p in list(self._profiles):
+            if profile_id is None or p["id"] == profile_id:
+                merged.update(p["stacks"])
+        return "".join(f"{stack} {count}\n" for stack, count in merged.most_common())
+
+    def info(self) -> dict:
+        return {
+            "threshold_ms": self.threshold_ms,
+            "sample_rate":  self.sample_rate,
+            "interval_ms":  self.interval * 1000,
+            "capacity":     self._profiles.maxlen,
+            "buffered":     len(self._profiles),
+            **self.stats,
+        }
+
+
+def from_env():
+    """Build a SamplingProfiler from MEDITRIAGE_PROFILE_* variables, or None if disabled."""
+    if os.environ.get("MEDITRIAGE_PROFILE", "").lower() not in ("1", "true", "yes", "on"):
+        return None
+    return SamplingProfiler(
+        threshold_ms=float(os.environ.get("MEDITRIAGE_PROFILE_THRESHOLD_MS", 500)),
+        sample_rate=float(os.environ.get("MEDITRIAGE_PROFILE_SAMPLE_RATE", 0)),
+        interval_ms=float(os.environ.get("MEDITRIAGE_PROFILE_INTERVAL_MS", 5)),
+        capacity=int(os.environ.get("MEDITRIAGE_PROFILE_CAPACITY", 50)),
+    )
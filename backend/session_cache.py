@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+MediTriageAI - Session Cache
+==============================
+Bounded in-memory cache for interactive refinement sessions. Entries expire
+after `ttl` seconds without access and the least recently used ones are
+evicted once the estimated memory use exceeds `max_bytes`.
+"""
+
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+
+def _sizeof(value) -> int:
+    """Rough byte size of a cached value (numpy arrays count their buffers)."""
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    nbytes = getattr(value, "nbytes", None)
+    if nbytes is not None:
+        return nbytes + 112  # ndarray header
+    return sys.getsizeof(value)
+
+
+class SessionCache:
+    """Thread-safe LRU cache with a sliding TTL and byte accounting."""
+
+    def __init__(self, max_bytes: int = 32 << 20, ttl: float = 900.0):
+        self.max_bytes = max_bytes
+        self.ttl       = ttl
+        self.bytes     = 0
+        self.stats     = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+        self._data     = OrderedDict()   # key -> (expires_at, nbytes, value)
+        self._lock     = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _drop(self, key) -> None:
+        _, nbytes, _ = self._data.pop(key)
+        self.bytes -= nbytes
+
+    def _purge_expired(self, now: float) -> None:
+        # Access order == expiry order with a sliding TTL, so only the front can be stale
+        while self._data:
+            key, (expires_at, _, _) = next(iter(self._data.items()))
+            if expires_at > now:
+                break
+            self._drop(key)
+            self.stats["expired"] += 1
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            self._purge_expired(now)
+            entry = self._data.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            _, nbytes, value = entry
+            self._data[key] = (now + self.ttl, nbytes, value)
+            self._data.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def put(self, key, value) -> None:
+        now    = time.monotonic()
+        nbytes = _sizeof(key) + _sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._purge_expired(now)
+            if nbytes > self.max_bytes:
+                return  # would evict everything else and still not fit
+            self._data[key] = (now + self.ttl, nbytes, value)
+            self.bytes += nbytes
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self._data)))
+                self.stats["evicted"] += 1
+
+    def pop(self, key) -> None:
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+
+    def info(self) -> dict:
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            return {"sessions": len(self._data), "bytes": self.bytes,
+                    "max_bytes": self.max_bytes, "ttl": self.ttl, **self.stats}
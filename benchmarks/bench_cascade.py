@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+MediTriageAI - Cascade Benchmark
+==================================
+Runs the held-out prompts (as in bench_early_exit.py) plus shortened
+versions with about half the symptoms dropped, first forest-only and then
+through the fast-path cascade. Reports the share served by the fast path,
+the latency distribution and agreement with the forest.
+
+Usage:
+  python benchmarks/bench_cascade.py
+"""
+
+import os
+import sys
+import time
+import random
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_early_exit import holdout_prompts, model_utils
+
+
+def _shorten(prompt, rng):
+    syms = prompt[len("I have "):].split(", ")
+    keep = [s for s in syms if rng.random() < 0.5] or [rng.choice(syms)]
+    return "I have " + ", ".join(keep)
+
+
+def _run(prompts):
+    out, times = [], []
+    for p in prompts:
+        t = time.perf_counter()
+        out.append(model_utils.predict(p))
+        times.append((time.perf_counter() - t) * 1000)
+    return out, np.array(times)
+
+
+def _pcts(times):
+    return "  ".join(f"p{q} {np.percentile(times, q):6.2f} ms" for q in (50, 90, 99))
+
+
+if __name__ == "__main__":
+    model_utils._load_artifacts()
+    if model_utils._fast is None:
+        sys.exit("❌ model/fast_model.pkl not found. Run: python model/train_model.py")
+
+    rng     = random.Random(7)
+    full    = holdout_prompts()
+    prompts = full + [_shorten(p, rng) for p in full]
+    print(f"📂 {len(prompts)} prompts ({len(full)} held-out rows + shortened copies)")
+
+    model_utils.CASCADE_ENABLED = False
+    forest, forest_t = _run(prompts)
+    model_utils.CASCADE_ENABLED = True
+    cascade, cascade_t = _run(prompts)
+
+    fast  = np.array([r["scored_by"] == "fast" for r in cascade])
+    top1  = np.array([a["predicted_disease"] == b["predicted_disease"] for a, b in zip(forest, cascade)])
+    emerg = np.array([a["is_emergency"] == b["is_emergency"] for a, b in zip(forest, cascade)])
+
+    print(f"\n⚡ Fast path served {fast.mean() * 100:.1f}% of prompts")
+    print(f"   forest only   {_pcts(forest_t)}")
+    print(f"   cascade       {_pcts(cascade_t)}")
+    print(f"     fast hits   {_pcts(cascade_t[fast])}")
+    if (~fast).any():
+        print(f"     fallbacks   {_pcts(cascade_t[~fast])}")
+    print(f"\n   agreement with forest: top-1 {top1.mean() * 100:.2f}% "
+          f"(fast path {top1[fast].mean() * 100:.2f}%), is_emergency {emerg.mean() * 100:.2f}%")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+MediTriageAI - Early-exit Forest Benchmark
+============================================
+Rebuilds the held-out split used by model/train_model.py (same encoding,
+test_size=0.2, random_state=42) and compares full evaluation against the
+early-exit modes of predict(): trees evaluated, latency and agreement.
+
+Usage:
+  python benchmarks/bench_early_exit.py [max_rows]
+"""
+
+import os
+import sys
+import time
+import statistics
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+import model_utils
+
+
+def holdout_prompts():
+    df = pd.read_csv(os.path.join(ROOT, "data", "dataset.csv"))
+    df.columns = df.columns.str.strip()
+    df = df.map(lambda x: x.strip() if isinstance(x, str) else x)
+    symptom_cols = [c for c in df.columns if c.startswith("Symptom")]
+    rows = [
+        [str(r[c]).strip().lower() for c in symptom_cols if pd.notna(r[c]) and str(r[c]).strip()]
+        for _, r in df.iterrows()
+    ]
+    le = model_utils._features["label_encoder"]
+    y  = le.transform(df["Disease"].str.strip())
+    _, test_rows = train_test_split(rows, test_size=0.2, random_state=42, stratify=y)
+    return ["I have " + ", ".join(s.replace("_", " ") for s in syms) for syms in test_rows]
+
+
+def _run(prompts, **kwargs):
+    out, times = [], []
+    for p in prompts:
+        t = time.perf_counter()
+        r = model_utils.predict(p, **kwargs)
+        times.append((time.perf_counter() - t) * 1000)
+        out.append(r)
+    return out, times
+
+
+if __name__ == "__main__":
+    model_utils._load_artifacts()
+    prompts = holdout_prompts()
+    if len(sys.argv) > 1:
+        prompts = prompts[: int(sys.argv[1])]
+    n_trees = len(model_utils._forest["roots"])
+    print(f"📂 {len(prompts)} held-out prompts, {n_trees} trees")
+
+    full, full_t = _run(prompts)
+    base_p50 = statistics.median(full_t)
+    print(f"\n   {'mode':<22}{'avg trees':>10}{'p50 ms':>9}{'speedup':>9}{'top-1 agree':>13}{'emergency agree':>17}")
+    print(f"   {'full':<22}{n_trees:>10.1f}{base_p50:>9.2f}{1:>8.2f}x{'—':>13}{'—':>17}")
+
+    for mode, delta in [("top1", None), ("top1", 0.05), ("emergency", None), ("emergency", 0.05)]:
+        res, t = _run(prompts, early_exit=mode, early_exit_delta=delta)
+        trees = np.mean([r["trees_used"] for r in res])
+        top1  = np.mean([a["predicted_disease"] == b["predicted_disease"] for a, b in zip(full, res)])
+        emerg = np.mean([a["is_emergency"] == b["is_emergency"] for a, b in zip(full, res)])
+        p50   = statistics.median(t)
+        label = mode + (f" δ={delta}" if delta else "")
+        print(f"   {label:<22}{trees:>10.1f}{p50:>9.2f}{base_p50 / p50:>8.2f}x{top1 * 100:>12.1f}%{emerg * 100:>16.1f}%")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+MediTriageAI - Explanation Overhead Benchmark
+===============================================
+Times predict() with and without explain=True on a set of sample prompts.
+Both paths are warmed up and timed in alternating order.
+Needs trained artifacts (python model/train_model.py).
+
+Usage:
+  python benchmarks/bench_explain.py [repeats]
+"""
+
+import os
+import sys
+import time
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+import model_utils
+
+PROMPTS = [
+    "I have severe chest pain and shortness of breath, sweating and vomiting",
+    "high fever, headache, nausea and muscle pain for three days",
+    "runny nose, continuous sneezing, mild cough and chills",
+    "stomach pain, vomiting, diarrhoea and a mild fever",
+    "itching, skin rash and nodal skin eruptions on my arms",
+    "yellowish skin, dark urine, fatigue and loss of appetite",
+]
+
+
+def _time_pair(repeats):
+    """
+    Time plain and explain=True predict() back to back on the same prompt,
+    swapping which goes first on every call, so caches, CPU frequency and
+    drift affect both paths alike. Returns (plain, explain) samples in ms.
+    """
+    plain, explain = [], []
+    for r in range(repeats):
+        for i, p in enumerate(PROMPTS):
+            for flag in ((False, True) if (r + i) % 2 == 0 else (True, False)):
+                t = time.perf_counter()
+                model_utils.predict(p, explain=flag)
+                (explain if flag else plain).append((time.perf_counter() - t) * 1000)
+    return plain, explain
+
+
+def _pcts(samples):
+    samples = sorted(samples)
+    return statistics.median(samples), samples[int(len(samples) * 0.95)]
+
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    t = time.perf_counter()
+    model_utils._load_artifacts()
+    print(f"📦 Artifacts + forest tables loaded in {(time.perf_counter() - t) * 1000:.0f} ms")
+    t = time.perf_counter()
+    model_utils._build_forest_tables(model_utils._model)
+    print(f"   (tables alone: {(time.perf_counter() - t) * 1000:.1f} ms, "
+          f"{model_utils._forest['value'].nbytes / 1e6:.1f} MB)")
+
+    for p in PROMPTS:  # warm-up, both paths
+        model_utils.predict(p)
+        model_utils.predict(p, explain=True)
+
+    plain, explain = _time_pair(repeats)
+    base_p50, base_p95 = _pcts(plain)
+    expl_p50, expl_p95 = _pcts(explain)
+    paired = statistics.median(e - b for b, e in zip(plain, explain))
+
+    print(f"\n⏱️  {len(plain)} calls each, interleaved")
+    print(f"   predict()              p50 {base_p50:7.2f} ms   p95 {base_p95:7.2f} ms")
+    print(f"   predict(explain=True)  p50 {expl_p50:7.2f} ms   p95 {expl_p95:7.2f} ms")
+    print(f"   overhead               p50 {expl_p50 - base_p50:+7.2f} ms ({(expl_p50 / base_p50 - 1) * 100:+.0f}%), "
+          f"median per-call pair {paired:+.2f} ms")
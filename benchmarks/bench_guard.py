@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+MediTriageAI - Request Guard Benchmark
+========================================
+1. Overhead: cost of TokenBucketLimiter.acquire() for one hot client and
+   for 100k distinct clients.
+2. Fairness: well-behaved clients (one request every 0.6 s each, distinct
+   addresses) share the Flask app with an abusive client that sends
+   200 KB prompts from several threads as fast as it can. Runs once with
+   the guard disabled and once with the defaults from guard.from_env(),
+   and reports the well-behaved clients' latency and success rate against
+   a baseline with no abusive client.
+
+Usage:
+  python benchmarks/bench_guard.py
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+import app as server
+import guard
+
+GOOD_CLIENTS   = 4
+GOOD_INTERVAL  = 0.6
+ABUSE_THREADS  = 4
+ABUSE_BODY     = json.dumps({"prompt": "I have a headache and " + "x" * 200_000})
+DURATION       = 6.0
+GOOD_PROMPTS   = ["chest pain and breathlessness", "itching and skin rash",
+                  "high fever with chills and vomiting", "cough and runny nose"]
+
+
+def _overhead():
+    limiter = guard.TokenBucketLimiter(rate=1e9, burst=1e9)
+    n = 200_000
+    t = time.perf_counter()
+    for _ in range(n):
+        limiter.acquire("10.0.0.1")
+    hot = (time.perf_counter() - t) / n * 1e9
+
+    keys = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(100_000)]
+    t = time.perf_counter()
+    for k in keys:
+        limiter.acquire(k)
+    spread = (time.perf_counter() - t) / len(keys) * 1e9
+    print(f"⏱️  acquire(): {hot:.0f} ns (one client), {spread:.0f} ns (100k clients, {len(limiter)} buckets)")
+
+
+def _load_test(label, abuse_threads=ABUSE_THREADS):
+    stop   = threading.Event()
+    good   = []   # (status, ms)
+    abuse  = {}
+
+    def good_client(i):
+        client = server.app.test_client()
+        addr   = f"192.168.0.{i + 1}"
+        while not stop.is_set():
+            t = time.perf_counter()
+            r = client.post("/analyze", json={"prompt": GOOD_PROMPTS[i % len(GOOD_PROMPTS)]},
+                            environ_base={"REMOTE_ADDR": addr})
+            good.append((r.status_code, (time.perf_counter() - t) * 1000))
+            stop.wait(GOOD_INTERVAL)
+
+    def abusive_client():
+        client = server.app.test_client()
+        while not stop.is_set():
+            r = client.post("/analyze", data=ABUSE_BODY, content_type="application/json",
+                            environ_base={"REMOTE_ADDR": "203.0.113.66"})
+            abuse[r.status_code] = abuse.get(r.status_code, 0) + 1
+
+    threads = ([threading.Thread(target=good_client, args=(i,)) for i in range(GOOD_CLIENTS)]
+               + [threading.Thread(target=abusive_client) for _ in range(abuse_threads)])
+    for th in threads:
+        th.start()
+    time.sleep(DURATION)
+    stop.set()
+    for th in threads:
+        th.join()
+
+    ok = np.array([ms for status, ms in good if status == 200])
+    print(f"\n{label}")
+    print(f"   well-behaved: {len(ok)}/{len(good)} OK, "
+          f"p50 {np.percentile(ok, 50):7.1f} ms  p99 {np.percentile(ok, 99):7.1f} ms")
+    if abuse:
+        print(f"   abusive:      {dict(sorted(abuse.items()))}")
+
+
+if __name__ == "__main__":
+    server.model_utils._load_artifacts()
+    _overhead()
+    _load_test("🙂 No abusive client", abuse_threads=0)
+
+    server._guard = guard.RequestGuard(max_body_bytes=0, max_prompt_chars=0, limiter=None)
+    server.app.config["MAX_CONTENT_LENGTH"] = None
+    _load_test("🚫 Guard off")
+
+    server._guard = guard.from_env()
+    server.app.config["MAX_CONTENT_LENGTH"] = server._guard.max_body_bytes or None
+    _load_test("🛡️  Guard on (defaults)")
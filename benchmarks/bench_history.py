@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+MediTriageAI - History Query Benchmark
+========================================
+Fills a throwaway SQLiteHistoryStore with N synthetic analyses and times
+the history read paths against the old "select every column" approach.
+
+Usage:
+  python benchmarks/bench_history.py              # 10k and 1M rows
+  python benchmarks/bench_history.py 10000 50000
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from history_store import SQLiteHistoryStore
+
+RISKS    = ["Low", "Medium", "High", "Critical"]
+DISEASES = [f"Disease {i}" for i in range(41)]
+REPORT   = "## Analysis Report\n" + ("Lorem ipsum dolor sit amet. " * 60)
+N_USERS  = 200
+
+
+def _populate(store, n):
+    rng = random.Random(42)
+    t0 = 1_700_000_000
+    batch = []
+    for i in range(n):
+        disease = rng.choice(DISEASES)
+        risk    = rng.choice(RISKS)
+        result  = {"predicted_disease": disease, "risk_level": risk, "detailed_analysis": REPORT}
+        batch.append({
+            "user_id":      f"user-{rng.randrange(N_USERS)}",
+            "prompt":       "I have chest pain and a high fever " * 3,
+            "disease":      disease,
+            "risk_level":   risk,
+            "confidence":   rng.random(),
+            "is_emergency": risk == "Critical",
+            "full_result":  result,
+            "created_at":   time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(t0 + i)) + f".{i % 1000000:06d}+00:00",
+        })
+        if len(batch) == 5000:
+            store.insert_many(batch)
+            batch = []
+    if batch:
+        store.insert_many(batch)
+
+
+def _time(fn, repeat=50):
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t) * 1000)
+    return statistics.median(samples)
+
+
+def run(n):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteHistoryStore(os.path.join(tmp, "bench.db"))
+        t = time.perf_counter()
+        _populate(store, n)
+        print(f"\n📦 {n:,} analyses inserted in {time.perf_counter() - t:.1f}s")
+
+        user = "user-7"
+        conn = store._conn()
+
+        def full_scan():
+            rows = conn.execute(
+                "SELECT * FROM analyses WHERE user_id = ? ORDER BY created_at DESC", (user,)
+            ).fetchall()
+            [json.loads(r[7]) for r in rows]
+
+        def naive_summary():
+            conn.execute(
+                "SELECT risk_level, COUNT(*) FROM analyses WHERE user_id = ? GROUP BY risk_level", (user,)
+            ).fetchall()
+            conn.execute(
+                "SELECT disease, COUNT(*) c FROM analyses WHERE user_id = ? "
+                "GROUP BY disease ORDER BY c DESC LIMIT 5", (user,)
+            ).fetchall()
+
+        # Cursor deep inside the user's history
+        cursor = None
+        for _ in range(10):
+            cursor = store.list_page(user, limit=20, cursor=cursor)["next_cursor"] or cursor
+
+        print(f"   select * (old history page)  {_time(full_scan, 5):9.3f} ms")
+        print(f"   list_page first page         {_time(lambda: store.list_page(user)):9.3f} ms")
+        print(f"   list_page page 11 (cursor)   {_time(lambda: store.list_page(user, cursor=cursor)):9.3f} ms")
+        print(f"   summary (GROUP BY scan)      {_time(naive_summary, 10):9.3f} ms")
+        print(f"   summary (rollup tables)      {_time(lambda: store.summary(user)):9.3f} ms")
+        store.close()
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 1_000_000]
+    print(f"⏱️  History benchmark ({N_USERS} users, median of repeated runs)")
+    for n in sizes:
+        run(n)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+MediTriageAI - Session Refinement Benchmark
+=============================================
+Replays "add one more symptom" refinement rounds built from the held-out
+split and compares the cost of re-scoring each round:
+
+  predict_proba   sklearn, whole forest
+  full walk       numpy walk of the whole forest (_walk_to_leaves)
+  session         _session_proba(), re-walking only affected trees
+
+Forests of growing size are trained on data/dataset.csv with the same
+settings as model/train_model.py.
+
+Usage:
+  python benchmarks/bench_session.py [n_trees ...]
+"""
+
+import os
+import sys
+import time
+import statistics
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+import model_utils
+
+
+def _dataset():
+    df = pd.read_csv(os.path.join(ROOT, "data", "dataset.csv"))
+    df.columns = df.columns.str.strip()
+    df = df.map(lambda x: x.strip() if isinstance(x, str) else x)
+    symptom_cols = [c for c in df.columns if c.startswith("Symptom")]
+    symptoms = model_utils._features["symptoms"]
+    index = {s: i for i, s in enumerate(symptoms)}
+    X = np.zeros((len(df), len(symptoms)), dtype=int)
+    for r, (_, row) in enumerate(df.iterrows()):
+        for c in symptom_cols:
+            if pd.notna(row[c]) and str(row[c]).strip():
+                X[r, index[str(row[c]).strip().lower()]] = 1
+    y = model_utils._features["label_encoder"].transform(df["Disease"].str.strip())
+    return train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+
+def _rounds(X_test, limit=200):
+    """Each held-out row becomes a session that reveals one symptom per round."""
+    sessions = []
+    for row in X_test[:limit]:
+        present = np.flatnonzero(row)
+        vecs, vec = [], np.zeros_like(row)
+        for f in present:
+            vec = vec.copy()
+            vec[f] = 1
+            vecs.append(vec)
+        sessions.append(vecs)
+    return sessions
+
+
+def _median_ms(fn, sessions):
+    """Median latency of every round after the first (the first one is a full score)."""
+    samples = []
+    for sid, vecs in enumerate(sessions):
+        for k, vec in enumerate(vecs):
+            t = time.perf_counter()
+            fn(sid, vec)
+            if k > 0:
+                samples.append((time.perf_counter() - t) * 1000)
+    return statistics.median(samples)
+
+
+if __name__ == "__main__":
+    model_utils._load_artifacts()
+    X_train, X_test, y_train, _ = _dataset()
+    sessions = _rounds(X_test)
+    sizes = [int(a) for a in sys.argv[1:]] or [50, 100, 200, 400, 800]
+    print(f"🔁 {sum(len(s) - 1 for s in sessions)} refinement rounds over {len(sessions)} sessions")
+    print(f"\n   {'trees':>6}{'predict_proba':>15}{'full walk':>12}{'session':>10}{'rescored':>10}{'speedup':>9}")
+
+    for n in sizes:
+        clf = RandomForestClassifier(n_estimators=n, random_state=42, n_jobs=-1, class_weight="balanced")
+        clf.fit(X_train, y_train)
+        model_utils._model  = clf
+        model_utils._forest = model_utils._build_forest_tables(clf)
+        model_utils._sessions = model_utils.SessionCache(max_bytes=256 << 20)
+
+        rescored, ids = [], {}
+
+        def session(sid, vec):
+            ids[sid], _, k, _ = model_utils._session_proba(ids.get(sid, model_utils.SESSION_NEW), vec)
+            if vec.sum() > 1:
+                rescored.append(k)
+
+        roots = model_utils._forest["roots"]
+        sk   = _median_ms(lambda sid, v: clf.predict_proba([v]), sessions)
+        walk = _median_ms(lambda sid, v: model_utils._walk_to_leaves(roots.copy(), v), sessions)
+        sess = _median_ms(session, sessions)
+        avg  = np.mean(rescored)
+        print(f"   {n:>6}{sk:>13.3f}ms{walk:>10.3f}ms{sess:>8.3f}ms{avg:>10.1f}{walk / sess:>8.2f}x")
+    print(f"\n   session memory: {model_utils.session_info()['bytes'] / len(sessions):,.0f} bytes/session at {sizes[-1]} trees")
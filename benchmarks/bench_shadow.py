@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+MediTriageAI - Shadow Scoring Benchmark
+=========================================
+Times predict() + ShadowScorer.observe() over the held-out prompts (as in
+bench_early_exit.py) with no shadow and with shadowing against a candidate
+model folder (default: model/ itself, the worst case for CPU contention).
+
+Off and on runs are interleaved over several rounds. The spread of p99
+across the "off" rounds is the noise band; the shadow's p99 cost should
+fall inside it. Two shadow settings are measured: the from_env() defaults
+(sample rate 0.1, queue 100, duty 0.25) and a stress setting that samples
+every prompt, so the queue fills and the drop path is exercised.
+
+Usage:
+  python benchmarks/bench_shadow.py [candidate_model_dir]
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_early_exit import holdout_prompts, model_utils
+import shadow
+
+ROUNDS = 5
+
+
+def _run(prompts, scorer=None):
+    times = []
+    for p in prompts:
+        t = time.perf_counter()
+        result = model_utils.predict(p)
+        if scorer is not None:
+            scorer.observe(p, result, (time.perf_counter() - t) * 1000)
+        times.append((time.perf_counter() - t) * 1000)
+    return np.array(times)
+
+
+def _compare(label, prompts, scorer):
+    off, on = [], []
+    for r in range(ROUNDS):
+        # Alternate the order so drift over time does not favour either side
+        if r % 2:
+            on.append(_run(prompts, scorer))
+            off.append(_run(prompts))
+        else:
+            off.append(_run(prompts))
+            on.append(_run(prompts, scorer))
+    scorer.close(timeout=60)
+    report = scorer.report()
+
+    p99_off = [np.percentile(t, 99) for t in off]
+    p99_on  = [np.percentile(t, 99) for t in on]
+    print(f"\n🕶️  {label}")
+    print(f"   p50  off {np.median([np.percentile(t, 50) for t in off]):6.2f} ms   "
+          f"on {np.median([np.percentile(t, 50) for t in on]):6.2f} ms")
+    print(f"   p99  off {np.median(p99_off):6.2f} ms   on {np.median(p99_on):6.2f} ms   "
+          f"(off rounds span {min(p99_off):.2f}-{max(p99_off):.2f} ms)")
+    print(f"   sampled {report['sampled']}, scored {report['scored']}, "
+          f"dropped {report['dropped']}, errors {report['errors']}, fatal {report['fatal']}")
+    print(f"   disagreement {report['disagreement_rate']}")
+
+
+if __name__ == "__main__":
+    candidate = os.path.abspath(sys.argv[1] if len(sys.argv) > 1 else model_utils.MODEL_DIR)
+    model_utils._load_artifacts()
+    prompts = holdout_prompts()
+    print(f"📂 {len(prompts)} held-out prompts x {ROUNDS} rounds, candidate: {candidate}")
+
+    for label, kwargs in (
+        ("Defaults (sample 0.1, queue 100, duty 0.25)", {}),
+        ("Stress (sample 1.0, queue 100, duty 0.25)", {"sample_rate": 1.0}),
+    ):
+        scorer = shadow.ShadowScorer(candidate, **kwargs)
+        time.sleep(3)  # let the worker load its artifacts before timing
+        _compare(label, prompts, scorer)
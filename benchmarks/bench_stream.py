@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+MediTriageAI - Streaming Benchmark
+====================================
+Serves backend/app.py on a local threaded HTTP server and posts the
+held-out prompts (as in bench_early_exit.py) to /analyze and to
+/analyze/stream, plain and with "explain": true. Compares the time until
+the client has the whole /analyze body with the time until the first
+(verdict) line of the stream arrives, and the stream's total time.
+
+Usage:
+  python benchmarks/bench_stream.py
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import http.client
+import numpy as np
+from werkzeug.serving import make_server
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_early_exit import holdout_prompts, model_utils
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+import app as server
+import guard
+
+N_PROMPTS = 300
+
+
+def _post(conn, path, body):
+    conn.request("POST", path, body=json.dumps(body), headers={"Content-Type": "application/json"})
+    return conn.getresponse()
+
+
+def _full(conn, body):
+    t = time.perf_counter()
+    resp = _post(conn, "/analyze", body)
+    resp.read()
+    return (time.perf_counter() - t) * 1000
+
+
+def _stream(conn, body):
+    t = time.perf_counter()
+    resp  = _post(conn, "/analyze/stream", body)
+    first = json.loads(resp.readline())
+    ttfv  = (time.perf_counter() - t) * 1000
+    assert first["event"] == "verdict", first
+    resp.read()
+    return ttfv, (time.perf_counter() - t) * 1000
+
+
+def _pcts(times):
+    return "  ".join(f"p{q} {np.percentile(times, q):6.2f} ms" for q in (50, 90, 99))
+
+
+if __name__ == "__main__":
+    model_utils._load_artifacts()
+    prompts = holdout_prompts()[:N_PROMPTS]
+    server._guard = guard.RequestGuard(limiter=None)   # one client hammering on purpose
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    httpd = make_server("127.0.0.1", 0, server.app, threaded=True)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    conn = http.client.HTTPConnection("127.0.0.1", httpd.server_port)
+    print(f"📂 {len(prompts)} held-out prompts, server on port {httpd.server_port}")
+
+    for label, extra in (("plain", {}), ("explain", {"explain": True})):
+        bodies = [{"prompt": p, **extra} for p in prompts]
+        for b in bodies[:20]:               # warm-up
+            _full(conn, b)
+            _stream(conn, b)
+        full   = np.array([_full(conn, b) for b in bodies])
+        stream = np.array([_stream(conn, b) for b in bodies])
+        print(f"\n📡 {label}")
+        print(f"   /analyze full body         {_pcts(full)}")
+        print(f"   /analyze/stream verdict    {_pcts(stream[:, 0])}")
+        print(f"   /analyze/stream complete   {_pcts(stream[:, 1])}")
+
+    httpd.shutdown()
@@ -93,9 +93,9 @@ async function runAnalysis(prompt) {
   const stepDelay = await animateLoadingSteps();
 
   try {
-    const response = await fetch(`${API_BASE}/analyze`, {
+    const response = await fetch(`${API_BASE}/analyze/stream`, {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers: { "Content-Type": "application/json", ...(await authHeaders()) },
       body: JSON.stringify({ prompt }),
     });
 
@@ -104,10 +104,23 @@ async function runAnalysis(prompt) {
       throw new Error(errData.error || `Server error: ${response.status}`);
     }
 
-    const data = await response.json();
-    clearTimeout(stepDelay);
-    await saveToHistory(prompt, data);  // persist to Supabase
-    showResults(data);
+    // NDJSON: the verdict arrives first, so risk and the emergency banner
+    // show before the predictions and the full report
+    const data = {};
+    await readEvents(response, (event, part) => {
+      if (event === "error") throw new Error(part.error);
+      Object.assign(data, part);
+      if (event === "verdict") {
+        clearTimeout(stepDelay);
+        showVerdict(data);
+      } else if (event === "predictions") {
+        showPredictions(data);
+      } else if (event === "analysis") {
+        showAnalysis(data);
+      }
+    });
+    if (!data.detailed_analysis) throw new Error("The analysis was interrupted. Please try again.");
+    saveToHistory(prompt, data);  // persist to Supabase in the background
 
   } catch (err) {
     clearTimeout(stepDelay);
@@ -115,6 +128,36 @@ async function runAnalysis(prompt) {
   }
 }
 
+// Signed-in users send their Supabase token so the server can attribute history
+async function authHeaders() {
+  try {
+    const { data: { session } } = await _supabase.auth.getSession();
+    return session ? { Authorization: `Bearer ${session.access_token}` } : {};
+  } catch (err) {
+    return {};
+  }
+}
+
+async function readEvents(response, onEvent) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = "";
+  while (true) {
+    const { done, value } = await reader.read();
+    buffered += decoder.decode(value || new Uint8Array(), { stream: !done });
+    let nl;
+    while ((nl = buffered.indexOf("\n")) >= 0) {
+      const line = buffered.slice(0, nl).trim();
+      buffered = buffered.slice(nl + 1);
+      if (line) {
+        const msg = JSON.parse(line);
+        onEvent(msg.event, msg.data);
+      }
+    }
+    if (done) break;
+  }
+}
+
 function animateLoadingSteps() {
   step1.className = "step active";
   step2.className = "step";
@@ -137,7 +180,7 @@ function animateLoadingSteps() {
 }
 
 // ─── Render Results ──────────────────────────────────────────────────────
-function showResults(data) {
+function showVerdict(data) {
   loadingSection.style.display = "none";
   resultsSection.style.display = "block";
   window.scrollTo({ top: 0, behavior: "smooth" });
@@ -177,6 +220,14 @@ function showResults(data) {
   document.getElementById("emergencyStatus").className = `summary-value ${data.is_emergency ? "risk-critical" : "risk-low"}`;
   document.getElementById("emergencyMeta").textContent = data.is_emergency ? "Seek immediate help" : "Monitor symptoms";
 
+  // Cleared until their parts arrive
+  document.getElementById("symptomsTags").innerHTML = "";
+  document.getElementById("predictionsList").innerHTML = "";
+  document.getElementById("precautionsList").innerHTML = "";
+  document.getElementById("analysisContent").innerHTML = "";
+}
+
+function showPredictions(data) {
   // ── Symptoms Detected ──
   const tagsDiv = document.getElementById("symptomsTags");
   tagsDiv.innerHTML = "";
@@ -217,7 +268,9 @@ function showResults(data) {
       el.style.width = el.dataset.width;
     });
   }, 120);
+}
 
+function showAnalysis(data) {
   // ── Precautions ──
   const precList = document.getElementById("precautionsList");
   precList.innerHTML = "";
@@ -2,8 +2,9 @@
 """
 MediTriageAI - Model Training Script
 =====================================
-Trains a RandomForestClassifier on the Disease-Symptom dataset from Kaggle.
-Saves: model.pkl, features.pkl, disease_info.pkl
+Trains a RandomForestClassifier on the Disease-Symptom dataset from Kaggle,
+plus a small logistic-regression fast path that inference tries first.
+Saves: model.pkl, features.pkl, disease_info.pkl, fast_model.pkl
 
 Dataset: https://www.kaggle.com/datasets/itachi9604/disease-symptom-description-dataset
 Place the 4 CSVs in ../data/ before running this script.
@@ -15,7 +16,9 @@ import pickle
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
+from sklearn.linear_model import LogisticRegression
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split, StratifiedKFold
 from sklearn.metrics import accuracy_score
 from sklearn.preprocessing import LabelEncoder
 
@@ -169,6 +172,132 @@ for disease in le.classes_:
         "is_emergency": is_emergency(disease, score),
     }
 
+# ─── Fast-path Model (cascade stage 1) ────────────────────────────────────────
+# A multinomial logistic regression over the same binary symptom vector. At
+# inference it answers alone when it is clearly confident; otherwise the
+# forest is used. It is fitted on the forest's training rows. Out-of-fold
+# predictions of both models on those rows are used to (1) calibrate it to
+# the forest's probabilities with a temperature and (2) pick the smallest
+# margins at which it still agrees with the forest: neither model has seen
+# the rows it is scored on, yet the production forest keeps the whole
+# training split. Real prompts usually name only a few symptoms, so each
+# fold is also replayed with about half its symptoms removed.
+print("⚡ Training fast-path model...")
+FAST_AGREEMENT_TARGET      = 0.999   # top-1 disease agreement with the forest
+EMERGENCY_AGREEMENT_TARGET = 0.999   # is_emergency agreement with the forest
+CALIBRATION_FOLDS          = 5
+
+def with_partial_rows(X_, seed=42):
+    """Stack X_ with a copy where each present symptom is kept with p=0.5 (at least one)."""
+    rng  = np.random.default_rng(seed)
+    keep = (rng.random(X_.shape) < 0.5) & (X_ == 1)
+    for i in np.flatnonzero(keep.sum(axis=1) == 0):
+        present = np.flatnonzero(X_[i])
+        if present.size:
+            keep[i, rng.choice(present)] = True
+    return np.vstack([X_, keep.astype(X_.dtype)])
+
+n_classes       = len(le.classes_)
+emergency_flags = np.array([disease_info[d]["is_emergency"] for d in le.classes_])
+
+def fit_fast(X_, y_):
+    """Logistic regression on (X_, y_) as full-width (coef, intercept) arrays."""
+    lr = LogisticRegression(max_iter=2000, C=10.0)
+    lr.fit(X_, y_)
+    coef_      = np.zeros((n_classes, X.shape[1]))
+    intercept_ = np.full(n_classes, -1e9)     # classes missing from y_ never win
+    coef_[lr.classes_]      = lr.coef_
+    intercept_[lr.classes_] = lr.intercept_
+    return coef_, intercept_
+
+def fast_logits(X_, params):
+    coef_, intercept_ = params
+    return X_ @ coef_.T + intercept_
+
+def softmax(z, temperature=1.0):
+    z = z / temperature
+    z = z - z.max(axis=1, keepdims=True)
+    p = np.exp(z)
+    return p / p.sum(axis=1, keepdims=True)
+
+def forest_proba(model, X_):
+    P = np.zeros((len(X_), n_classes))
+    P[:, model.classes_] = model.predict_proba(X_)
+    return P
+
+def margins(P):
+    """Top-1 margin and emergency margin (best emergency vs best non-emergency class)."""
+    top2 = np.sort(P, axis=1)[:, -2:]
+    top1_margin = top2[:, 1] - top2[:, 0]
+    if emergency_flags.all() or not emergency_flags.any():
+        return top1_margin, np.full(len(P), np.inf)
+    emerg_margin = np.abs(P[:, emergency_flags].max(axis=1) - P[:, ~emergency_flags].max(axis=1))
+    return top1_margin, emerg_margin
+
+def choose_threshold(margin, agree, target):
+    """Smallest margin whose "margin >= threshold" subset still meets the agreement target."""
+    order = np.argsort(-margin)
+    rate  = np.cumsum(agree[order]) / np.arange(1, len(order) + 1)
+    ok    = np.flatnonzero(rate >= target)
+    return float(margin[order][ok[-1]]) if ok.size else float("inf")
+
+# Out-of-fold scores: each fold is scored by a forest and a fast model
+# trained on the other folds
+folds = StratifiedKFold(n_splits=CALIBRATION_FOLDS, shuffle=True, random_state=42)
+forest_P_val, Z_val = [], []
+for k, (fit_idx, val_idx) in enumerate(folds.split(X_train, y_train)):
+    X_fold = with_partial_rows(X_train[val_idx], seed=42 + k)
+    fold_clf = clone(clf).fit(X_train[fit_idx], y_train[fit_idx])
+    forest_P_val.append(forest_proba(fold_clf, X_fold))
+    Z_val.append(fast_logits(X_fold, fit_fast(X_train[fit_idx], y_train[fit_idx])))
+forest_P_val = np.vstack(forest_P_val)
+Z_val        = np.vstack(Z_val)
+forest_val   = forest_P_val.argmax(axis=1)
+
+# Temperature that best matches the forest's probabilities (KL divergence)
+temps = np.geomspace(0.1, 10.0, 41)
+kl    = [
+    (forest_P_val * (np.log(forest_P_val + 1e-12) - np.log(softmax(Z_val, T) + 1e-12))).sum(axis=1).mean()
+    for T in temps
+]
+temperature = float(temps[int(np.argmin(kl))])
+
+P_val         = softmax(Z_val, temperature)
+fast_val      = P_val.argmax(axis=1)
+m_top, m_emer = margins(P_val)
+margin_threshold    = choose_threshold(m_top, fast_val == forest_val, FAST_AGREEMENT_TARGET)
+emergency_threshold = choose_threshold(
+    m_emer, emergency_flags[fast_val] == emergency_flags[forest_val], EMERGENCY_AGREEMENT_TARGET
+)
+
+# The shipped fast model is fitted on the whole training split, like the forest
+coef, intercept = fit_fast(X_train, y_train)
+
+# Report on the untouched test split (full and partial rows)
+X_report      = with_partial_rows(X_test, seed=7)
+forest_report = clf.predict(X_report)
+forest_acc    = accuracy_score(np.concatenate([y_test, y_test]), forest_report)
+P_report      = softmax(fast_logits(X_report, (coef, intercept)), temperature)
+fast_report   = P_report.argmax(axis=1)
+m_top, m_emer = margins(P_report)
+served_fast   = (m_top >= margin_threshold) & (m_emer >= emergency_threshold)
+fast_share    = served_fast.mean()
+fast_agree    = (fast_report[served_fast] == forest_report[served_fast]).mean() if served_fast.any() else 1.0
+print(f"✅ Forest accuracy on test rows: {acc * 100:.2f}% full, "
+      f"{forest_acc * 100:.2f}% full + partial")
+print(f"✅ Fast path: temperature {temperature:.2f}, margin ≥ {margin_threshold:.3f}, "
+      f"emergency margin ≥ {emergency_threshold:.3f}")
+print(f"   Serves {fast_share * 100:.1f}% of test rows (full + partial), agreeing with the "
+      f"forest on {fast_agree * 100:.2f}% of them")
+
+fast_model = {
+    "coef":                coef,
+    "intercept":           intercept,
+    "temperature":         temperature,
+    "margin_threshold":    margin_threshold,
+    "emergency_threshold": emergency_threshold,
+}
+
 # ─── Save Artifacts ───────────────────────────────────────────────────────────
 print("💾 Saving model artifacts...")
 
@@ -181,10 +310,15 @@ with open(os.path.join(MODEL_DIR, "features.pkl"), "wb") as f:
 with open(os.path.join(MODEL_DIR, "disease_info.pkl"), "wb") as f:
     pickle.dump(disease_info, f)
 
+with open(os.path.join(MODEL_DIR, "fast_model.pkl"), "wb") as f:
+    pickle.dump(fast_model, f)
+
 print("\n🎉 Training complete!")
 print(f"   ✅ model.pkl      → {os.path.join(MODEL_DIR, 'model.pkl')}")
 print(f"   ✅ features.pkl   → {os.path.join(MODEL_DIR, 'features.pkl')}")
 print(f"   ✅ disease_info.pkl → {os.path.join(MODEL_DIR, 'disease_info.pkl')}")
-print(f"\n   🎯 Accuracy: {acc * 100:.2f}%")
+print(f"   ✅ fast_model.pkl → {os.path.join(MODEL_DIR, 'fast_model.pkl')}")
+print(f"\n   🎯 Accuracy: {acc * 100:.2f}% ({forest_acc * 100:.2f}% with partial rows)")
+print(f"   ⚡ Fast path: {fast_share * 100:.1f}% of traffic")
 print(f"   📊 Diseases: {len(le.classes_)}")
 print(f"   💊 Symptoms: {len(all_symptoms)}")
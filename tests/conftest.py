@@ -0,0 +1,31 @@
+import os
+import sys
+import hmac
+import json
+import time
+import base64
+import hashlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+
+class FakeClock:
+    """Stands in for the `time` module of the code under test."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def make_token(secret: str, header: dict = None, **claims) -> str:
+    """HS256 JWT shaped like a Supabase access token."""
+    enc = lambda d: base64.urlsafe_b64encode(json.dumps(d).encode()).decode().rstrip("=")
+    claims = {"sub": "user-1", "aud": "authenticated", "exp": time.time() + 3600, **claims}
+    signing_input = f"{enc(header or {'alg': 'HS256', 'typ': 'JWT'})}.{enc(claims)}"
+    sig = hmac.new(secret.encode(), signing_input.encode(), hashlib.sha256).digest()
+    return f"{signing_input}.{base64.urlsafe_b64encode(sig).decode().rstrip('=')}"
@@ -0,0 +1,48 @@
+import time
+
+import auth
+from conftest import make_token
+
+SECRET = "test-secret"
+
+
+def test_valid_token_yields_sub():
+    assert auth.verify_token(make_token(SECRET), SECRET) == "user-1"
+
+
+def test_bad_signature_is_rejected():
+    assert auth.verify_token(make_token("other-secret"), SECRET) is None
+    header, payload, sig = make_token(SECRET).split(".")
+    assert auth.verify_token(f"{header}.{payload}.{sig[:-2]}AA", SECRET) is None
+
+
+def test_wrong_alg_is_rejected():
+    unsigned = make_token(SECRET, header={"alg": "none"}).rsplit(".", 1)[0] + "."
+    assert auth.verify_token(unsigned, SECRET) is None
+    assert auth.verify_token(make_token(SECRET, header={"alg": "HS512"}), SECRET) is None
+
+
+def test_expired_or_missing_exp_is_rejected():
+    assert auth.verify_token(make_token(SECRET, exp=time.time() - 1), SECRET) is None
+    assert auth.verify_token(make_token(SECRET, exp=None), SECRET) is None
+    assert auth.verify_token(make_token(SECRET, exp=100), SECRET, now=99) == "user-1"
+
+
+def test_audience_must_match():
+    assert auth.verify_token(make_token(SECRET, aud="anon"), SECRET) is None
+    assert auth.verify_token(make_token(SECRET, aud=["x", "authenticated"]), SECRET) == "user-1"
+
+
+def test_malformed_input_and_missing_sub_are_rejected():
+    for token in ("", "a.b", "a.b.c", "###.###.###", make_token(SECRET, sub=""), make_token(SECRET, sub=7)):
+        assert auth.verify_token(token, SECRET) is None
+    assert auth.verify_token(make_token(SECRET), "") is None
+
+
+def test_user_from_header(monkeypatch):
+    monkeypatch.setenv("MEDITRIAGE_SUPABASE_JWT_SECRET", SECRET)
+    token = make_token(SECRET)
+    assert auth.user_from_header(f"Bearer {token}") == "user-1"
+    assert auth.user_from_header(f"bearer {token}") == "user-1"
+    assert auth.user_from_header(f"Basic {token}") is None
+    assert auth.user_from_header(None) is None
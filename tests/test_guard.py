@@ -0,0 +1,63 @@
+import guard
+from guard import RequestGuard, TokenBucketLimiter
+from conftest import FakeClock
+
+
+def _limiter(monkeypatch, **kwargs):
+    clock = FakeClock()
+    monkeypatch.setattr(guard, "time", clock)
+    return TokenBucketLimiter(**kwargs), clock
+
+
+def test_bucket_refills_at_rate(monkeypatch):
+    limiter, clock = _limiter(monkeypatch, rate=2, burst=3)
+
+    assert [limiter.acquire("c") for _ in range(3)] == [0.0] * 3
+    assert limiter.acquire("c") == 0.5
+
+    clock.advance(0.5)
+    assert limiter.acquire("c") == 0.0
+    assert limiter.acquire("c") > 0
+    assert limiter.acquire("other") == 0.0
+
+
+def test_idle_buckets_are_evicted(monkeypatch):
+    limiter, clock = _limiter(monkeypatch, rate=2, burst=4, shards=1)
+    limiter.acquire("idle")
+
+    clock.advance(limiter.idle_ttl + 0.1)
+    limiter.acquire("active")
+
+    assert len(limiter) == 1
+    assert limiter.stats["evicted"] == 1
+
+
+def test_shard_cap_evicts_least_recently_seen(monkeypatch):
+    limiter, _ = _limiter(monkeypatch, max_clients=2, shards=1)
+    for key in ("a", "b", "a", "c"):
+        limiter.acquire(key)
+
+    assert len(limiter) == 2
+    assert limiter.stats["evicted"] == 1
+
+
+def test_limited_request_gets_429_with_retry_after(monkeypatch):
+    limiter, _ = _limiter(monkeypatch, rate=0.25, burst=1)
+    g = RequestGuard(limiter=limiter)
+
+    assert g.check_request("c", 10) is None
+    status, body, headers = g.check_request("c", 10)
+
+    assert status == 429
+    assert headers == {"Retry-After": "4"}
+    assert body["retry_after"] == 4
+
+
+def test_client_key_uses_trusted_hop_only():
+    xff = "6.6.6.6, 1.1.1.1, 10.0.0.2"
+
+    assert RequestGuard().client_key("10.0.0.1", xff) == "10.0.0.1"
+    assert RequestGuard(trusted_proxies=1).client_key("10.0.0.1", xff) == "10.0.0.2"
+    assert RequestGuard(trusted_proxies=2).client_key("10.0.0.1", xff) == "1.1.1.1"
+    # Fewer entries than trusted proxies: fall back to the socket address
+    assert RequestGuard(trusted_proxies=4).client_key("10.0.0.1", xff) == "10.0.0.1"
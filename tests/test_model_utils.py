@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+import pytest
+
+import model_utils
+
+pytestmark = pytest.mark.skipif(
+    not os.path.exists(os.path.join(model_utils.MODEL_DIR, "model.pkl")),
+    reason="model/model.pkl not trained",
+)
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    model_utils._load_artifacts()
+    rng = np.random.default_rng(0)
+    n   = model_utils._forest["n_features"]
+    out = []
+    for _ in range(40):
+        vec = np.zeros(n, dtype=np.uint8)
+        vec[rng.choice(n, size=rng.integers(1, 8), replace=False)] = 1
+        out.append(vec)
+    return out
+
+
+def _full_proba(vec):
+    return model_utils._model.predict_proba([vec])[0]
+
+
+def test_session_rescoring_matches_full_forest(vectors):
+    # Each vector refines the previous one in the same session
+    session_id = model_utils.SESSION_NEW
+    for vec in vectors:
+        session_id, proba, _, _ = model_utils._session_proba(session_id, vec)
+        np.testing.assert_allclose(proba, _full_proba(vec), atol=1e-5)
+    model_utils._sessions.pop(session_id)
+
+
+def test_sessions_use_server_issued_ids_only(vectors):
+    first  = model_utils.predict("chest pain, vomiting and breathlessness", session_id="new")
+    second = model_utils.predict("I have itching", session_id="new")
+    sid    = first["session"]["id"]
+
+    assert sid != second["session"]["id"] and len(sid) >= 20
+    # A client-chosen or guessed id never reaches another caller's session
+    for guess in ("abc123", "new-session", sid[:-1]):
+        assert "Unknown or expired session_id" in model_utils.predict("I have itching", session_id=guess)["error"]
+
+    refined = model_utils.predict("chest pain and vomiting", session_id=sid)
+    assert refined["session"]["id"] == sid
+    assert refined["session"]["symptoms_removed"] == ["breathlessness"]
+    assert model_utils._session_proba("abc123", vectors[0]) is None
+
+
+@pytest.mark.parametrize("mode", model_utils.EARLY_EXIT_MODES)
+def test_early_exit_matches_trees_used(vectors, mode):
+    estimators = model_utils._model.estimators_
+    for vec in vectors:
+        proba, used = model_utils._anytime_proba(vec, mode)
+        partial = np.mean([e.predict_proba([vec])[0] for e in estimators[:used]], axis=0)
+        np.testing.assert_allclose(proba, partial, atol=1e-5)
+        if mode == "top1":
+            assert proba.argmax() == _full_proba(vec).argmax()
+
+
+def test_contributions_sum_to_confidence(vectors):
+    symptoms = model_utils._features["symptoms"]
+    for vec in vectors:
+        prompt = ", ".join(symptoms[i].replace("_", " ") for i in np.flatnonzero(vec))
+        result = model_utils.predict(prompt, explain=True)
+        c = result["symptom_contributions"]
+        total = c["baseline"] + c["absent_symptoms"] + sum(s["contribution"] for s in c["symptoms"])
+        # Every term is rounded to 4 places
+        assert total == pytest.approx(result["confidence"], abs=5e-5 * (len(c["symptoms"]) + 3))
+
+
+@pytest.mark.parametrize("mode", model_utils.EARLY_EXIT_MODES)
+def test_early_exit_delta_stops_no_later_and_agrees(vectors, mode):
+    flags = model_utils._forest["emergency"]
+    for vec in vectors:
+        exact, exact_used = model_utils._anytime_proba(vec, mode)
+        proba, used = model_utils._anytime_proba(vec, mode, delta=0.05)
+        assert used <= exact_used
+        if mode == "top1":
+            assert proba.argmax() == exact.argmax()
+        else:
+            assert flags[proba.argmax()] == flags[exact.argmax()]
+
+
+@pytest.mark.parametrize("options, error", [
+    ({"early_exit": "fastest"}, "early_exit must be one of"),
+    ({"early_exit": "top1", "early_exit_delta": 1.5}, "between 0 and 1"),
+    ({"early_exit_delta": 0.05}, "requires early_exit"),
+])
+def test_early_exit_options_are_validated(options, error):
+    assert error in model_utils.predict("I have itching", **options)["error"]
@@ -0,0 +1,53 @@
+import numpy as np
+
+import session_cache
+from session_cache import SessionCache
+from conftest import FakeClock
+
+
+def _cache(monkeypatch, **kwargs):
+    clock = FakeClock()
+    monkeypatch.setattr(session_cache, "time", clock)
+    return SessionCache(**kwargs), clock
+
+
+def test_entry_expires_after_ttl_without_access(monkeypatch):
+    cache, clock = _cache(monkeypatch, ttl=10)
+    cache.put("a", {"v": 1})
+
+    clock.advance(9)
+    assert cache.get("a") == {"v": 1}
+
+    # The get() above slid the deadline forward
+    clock.advance(9)
+    assert cache.get("a") == {"v": 1}
+
+    clock.advance(10)
+    assert cache.get("a") is None
+    assert len(cache) == 0 and cache.bytes == 0
+    assert cache.stats["expired"] == 1
+
+
+def test_byte_budget_evicts_least_recently_used(monkeypatch):
+    value = lambda: {"vec": np.zeros(1000, dtype=np.uint8)}
+    one   = session_cache._sizeof("a") + session_cache._sizeof(value())
+    cache, _ = _cache(monkeypatch, max_bytes=3 * one)
+
+    for key in "abc":
+        cache.put(key, value())
+    cache.get("a")                     # "b" is now the least recently used
+    cache.put("d", value())
+
+    assert cache.get("b") is None
+    assert all(cache.get(k) is not None for k in "acd")
+    assert cache.stats["evicted"] == 1
+    assert cache.bytes == 3 * one <= cache.max_bytes
+
+
+def test_value_larger_than_budget_is_not_cached(monkeypatch):
+    cache, _ = _cache(monkeypatch, max_bytes=1024)
+    cache.put("small", {"v": 1})
+    cache.put("big", {"vec": np.zeros(4096, dtype=np.uint8)})
+
+    assert cache.get("big") is None
+    assert cache.get("small") == {"v": 1}